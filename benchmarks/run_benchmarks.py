@@ -0,0 +1,240 @@
+"""Time and memory benchmarks for each pipeline stage.
+
+Runs entirely offline on the synthetic data from :mod:`benchmarks.synthetic`.
+
+Examples
+--------
+Record a baseline::
+
+    python -m benchmarks.run_benchmarks --scales small medium --save-baseline benchmarks/baseline.json
+
+Compare against it, failing on a >25% slowdown::
+
+    python -m benchmarks.run_benchmarks --scales small medium --baseline benchmarks/baseline.json --threshold 0.25
+
+Measure the effect of ``CRYPTOSCANNER_COMPACT_DTYPES`` by running every
+stage on both plain and compact inputs::
+
+    python -m benchmarks.run_benchmarks --scales medium --compact
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+import pandas as pd
+import pyarrow as pa
+
+from cryptoscanner.bigquery_client import compact_to_pandas
+
+from cryptoscanner.module_1_1 import normalize_binance_data
+from cryptoscanner.module_1_2 import compute_moving_averages
+from cryptoscanner.module_1_3 import generate_decisions
+from cryptoscanner.module_2_1_1 import convert_decimal_to_float
+from cryptoscanner.module_2_2 import compute_daily_aggregate
+from cryptoscanner.module_2_3 import detect_anomalies
+from cryptoscanner.module_3_1 import build_summary_from_dfs
+
+from . import synthetic
+
+SCALES: Dict[str, Dict[str, int]] = {
+    "small": {"symbols": 200, "snapshots": 5, "transactions": 10_000, "days": 30},
+    "medium": {"symbols": 2000, "snapshots": 20, "transactions": 100_000, "days": 365},
+    "large": {"symbols": 2000, "snapshots": 100, "transactions": 1_000_000, "days": 3650},
+}
+
+
+@dataclass
+class Stage:
+    """A benchmarked function together with a factory for its inputs."""
+
+    name: str
+    func: Callable[..., Any]
+    make_inputs: Callable[[Dict[str, int]], tuple]
+    copy_inputs: bool = False
+
+
+STAGES: List[Stage] = [
+    Stage(
+        "normalize_binance_data",
+        normalize_binance_data,
+        lambda s: (synthetic.make_binance_ticker(s["symbols"] * s["snapshots"]),),
+    ),
+    Stage(
+        "compute_moving_averages",
+        compute_moving_averages,
+        lambda s: (synthetic.make_market_raw_metrics(s["symbols"], s["snapshots"]),),
+        copy_inputs=True,
+    ),
+    Stage(
+        "generate_decisions",
+        generate_decisions,
+        lambda s: (synthetic.make_strategy_signals(s["symbols"]),),
+    ),
+    Stage(
+        "convert_decimal_to_float",
+        convert_decimal_to_float,
+        lambda s: (synthetic.make_onchain_transactions(s["transactions"]),),
+        copy_inputs=True,
+    ),
+    Stage(
+        "compute_daily_aggregate",
+        compute_daily_aggregate,
+        lambda s: (synthetic.make_onchain_transactions(s["transactions"], as_decimal=False),),
+        copy_inputs=True,
+    ),
+    Stage(
+        "detect_anomalies",
+        detect_anomalies,
+        lambda s: (synthetic.make_daily_onchain(s["days"]),),
+        copy_inputs=True,
+    ),
+    Stage(
+        "build_summary_from_dfs",
+        build_summary_from_dfs,
+        lambda s: (synthetic.make_decisions(s["symbols"]), synthetic.make_anomalies(s["days"])),
+    ),
+]
+
+
+def _fresh(args: tuple, copy_inputs: bool) -> tuple:
+    if not copy_inputs:
+        return args
+    return tuple(a.copy() if isinstance(a, pd.DataFrame) else a for a in args)
+
+
+def _compact(args: tuple) -> tuple:
+    """Give DataFrame inputs the dtypes of a compact BigQuery read."""
+    return tuple(
+        compact_to_pandas(pa.Table.from_pandas(a, preserve_index=False)) if isinstance(a, pd.DataFrame) else a
+        for a in args
+    )
+
+
+def _input_mb(args: tuple) -> float:
+    return sum(
+        a.memory_usage(index=False, deep=True).sum() for a in args if isinstance(a, pd.DataFrame)
+    ) / 1e6
+
+
+def measure(stage: Stage, args: tuple, repeat: int = 3) -> Dict[str, float]:
+    """Return the best wall time, the peak traced memory and the input size of ``stage``.
+
+    Timing and memory are measured in separate runs because tracemalloc
+    slows allocation-heavy code down considerably.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        call_args = _fresh(args, stage.copy_inputs)
+        start = time.perf_counter()
+        stage.func(*call_args)
+        best = min(best, time.perf_counter() - start)
+
+    call_args = _fresh(args, stage.copy_inputs)
+    tracemalloc.start()
+    try:
+        stage.func(*call_args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": best, "peak_mb": peak / 1e6, "input_mb": _input_mb(args)}
+
+
+def run(
+    scales: List[str],
+    stages: List[str] | None = None,
+    repeat: int = 3,
+    compact: bool = False,
+) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Benchmark the selected stages at each scale.
+
+    With ``compact`` every stage also runs on compact-dtype inputs, reported
+    under the ``<scale>/compact`` key.
+    """
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    variants = [False, True] if compact else [False]
+    for scale in scales:
+        sizes = SCALES[scale]
+        for use_compact in variants:
+            label = f"{scale}/compact" if use_compact else scale
+            results[label] = {}
+            for stage in STAGES:
+                if stages and stage.name not in stages:
+                    continue
+                args = stage.make_inputs(sizes)
+                if use_compact:
+                    args = _compact(args)
+                results[label][stage.name] = measure(stage, args, repeat)
+                r = results[label][stage.name]
+                print(
+                    f"{label:<14} {stage.name:<26} {r['seconds']:>10.4f}s "
+                    f"{r['peak_mb']:>10.1f}MB peak {r['input_mb']:>10.1f}MB input"
+                )
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, Dict[str, float]]],
+    baseline: Dict[str, Dict[str, Dict[str, float]]],
+    threshold: float,
+    min_seconds: float = 0.005,
+) -> List[str]:
+    """Return a description of every metric that regressed past ``threshold``.
+
+    Timings below ``min_seconds`` in the baseline are too noisy to compare
+    and are skipped.
+    """
+    regressions = []
+    for scale, stages in results.items():
+        for name, current in stages.items():
+            previous = baseline.get(scale, {}).get(name)
+            if not previous:
+                continue
+            for metric in ("seconds", "peak_mb"):
+                before, after = previous[metric], current[metric]
+                if metric == "seconds" and before < min_seconds:
+                    continue
+                if before > 0 and (after - before) / before > threshold:
+                    regressions.append(
+                        f"{scale}/{name} {metric}: {before:.4f} -> {after:.4f} "
+                        f"(+{(after - before) / before:.0%})"
+                    )
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=["small"])
+    parser.add_argument("--stages", nargs="+", choices=[s.name for s in STAGES])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--compact", action="store_true", help="also run every stage on compact-dtype inputs")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--baseline", metavar="PATH")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args(argv)
+    logging.getLogger("cryptoscanner").setLevel(logging.WARNING)
+
+    results = run(args.scales, args.stages, args.repeat, args.compact)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as fh:
+            json.dump(results, fh, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
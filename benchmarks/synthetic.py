@@ -0,0 +1,134 @@
+"""Seeded synthetic data generators shaped like the pipeline inputs.
+
+Every generator takes an explicit ``seed`` so that runs at the same scale
+always see identical data and timings can be compared across commits.
+"""
+
+from __future__ import annotations
+
+import decimal
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+START = pd.Timestamp("2024-01-01")
+
+
+def make_symbols(n_symbols: int) -> List[str]:
+    """Return ``n_symbols`` distinct Binance-like symbol names."""
+    return [f"SYM{i:05d}USDT" for i in range(n_symbols)]
+
+
+def make_binance_ticker(n_symbols: int = 2000, seed: int = 0) -> List[Dict[str, Any]]:
+    """Return one raw 24hr ticker payload as returned by the Binance API.
+
+    Numeric fields are strings and ``closeTime`` is in milliseconds, like
+    the real endpoint.
+    """
+    rng = np.random.default_rng(seed)
+    prices = rng.lognormal(mean=0.0, sigma=2.0, size=n_symbols)
+    changes = rng.normal(0.0, 5.0, size=n_symbols)
+    close_ms = int(START.timestamp() * 1000) + rng.integers(0, 60_000, size=n_symbols)
+    return [
+        {
+            "symbol": symbol,
+            "priceChangePercent": f"{change:.3f}",
+            "lastPrice": f"{price:.8f}",
+            "quoteVolume": f"{price * 1e4:.2f}",
+            "closeTime": int(ms),
+        }
+        for symbol, change, price, ms in zip(make_symbols(n_symbols), changes, prices, close_ms)
+    ]
+
+
+def make_market_raw_metrics(n_symbols: int = 2000, n_snapshots: int = 20, seed: int = 0) -> pd.DataFrame:
+    """Return ``n_symbols`` x ``n_snapshots`` rows shaped like ``market_raw_metrics``.
+
+    Prices follow a per-symbol random walk and snapshots are spaced by
+    roughly one minute with jitter, as produced by repeated ingestion.
+    """
+    rng = np.random.default_rng(seed)
+    symbols = np.array(make_symbols(n_symbols))
+    base = rng.lognormal(mean=0.0, sigma=2.0, size=n_symbols)
+    steps = rng.normal(0.0, 0.01, size=(n_snapshots, n_symbols))
+    prices = base * np.exp(np.cumsum(steps, axis=0))
+    offsets = np.arange(n_snapshots)[:, None] * 60 + rng.integers(0, 10, size=(n_snapshots, n_symbols))
+    return pd.DataFrame({
+        "symbol": np.tile(symbols, n_snapshots),
+        "priceChangePercent": rng.normal(0.0, 5.0, size=n_snapshots * n_symbols),
+        "lastPrice": prices.ravel(),
+        "closeTime": START + pd.to_timedelta(offsets.ravel(), unit="s"),
+    })
+
+
+def make_strategy_signals(n_symbols: int = 2000, seed: int = 0) -> pd.DataFrame:
+    """Return one row of ``ma5``/``ma20`` per symbol."""
+    rng = np.random.default_rng(seed)
+    ma20 = rng.lognormal(mean=0.0, sigma=2.0, size=n_symbols)
+    ma5 = ma20 * (1 + rng.normal(0.0, 0.02, size=n_symbols))
+    return pd.DataFrame({"symbol": make_symbols(n_symbols), "ma5": ma5, "ma20": ma20})
+
+
+def make_decisions(n_symbols: int = 2000, seed: int = 0) -> pd.DataFrame:
+    """Return rows shaped like ``market_decision_outputs``."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "symbol": make_symbols(n_symbols),
+        "decision": np.where(rng.random(n_symbols) > 0.5, "LONG", "SHORT"),
+        "timestamp": pd.Timestamp("2024-01-01", tz="UTC"),
+    })
+
+
+def make_onchain_transactions(
+    n_rows: int = 1_000_000,
+    n_addresses: int = 50_000,
+    n_days: int = 30,
+    seed: int = 0,
+    as_decimal: bool = True,
+) -> pd.DataFrame:
+    """Return rows shaped like the public Ethereum transactions pull.
+
+    With ``as_decimal`` the value columns hold ``decimal.Decimal`` objects
+    and ``address`` holds raw 20-byte ``bytes``, which is what the
+    BigQuery client returns for NUMERIC and BYTES columns.
+    """
+    rng = np.random.default_rng(seed)
+    seconds = rng.integers(0, n_days * 86_400, size=n_rows)
+    eth = rng.lognormal(mean=-2.0, sigma=2.0, size=n_rows)
+    gas = rng.lognormal(mean=3.0, sigma=0.5, size=n_rows)
+    pool = rng.integers(0, 256, size=(n_addresses, 20), dtype=np.uint8)
+    idx = rng.integers(0, n_addresses, size=n_rows)
+    if as_decimal:
+        addresses = [pool[i].tobytes() for i in idx]
+        eth_col = [decimal.Decimal(f"{x:.18f}") for x in eth]
+        gas_col = [decimal.Decimal(f"{x:.9f}") for x in gas]
+    else:
+        addresses = [pool[i].tobytes().hex() for i in idx]
+        eth_col, gas_col = eth, gas
+    return pd.DataFrame({
+        "timestamp": START + pd.to_timedelta(np.sort(seconds), unit="s"),
+        "address": addresses,
+        "eth_transferred": eth_col,
+        "gas_price_gwei": gas_col,
+        "source": "ethereum",
+    })
+
+
+def make_daily_onchain(n_days: int = 365, seed: int = 0) -> pd.DataFrame:
+    """Return daily aggregates as fed to ``detect_anomalies``."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "date": pd.date_range(START, periods=n_days, freq="D").date,
+        "eth_transferred": rng.lognormal(mean=10.0, sigma=0.3, size=n_days),
+        "gas_price_gwei": rng.lognormal(mean=3.0, sigma=0.3, size=n_days),
+    })
+
+
+def make_anomalies(n_days: int = 365, seed: int = 0) -> pd.DataFrame:
+    """Return rows shaped like ``anomaly_alerts_onchain``."""
+    rng = np.random.default_rng(seed)
+    df = make_daily_onchain(n_days, seed)
+    df["anomaly_eth_transferred"] = rng.random(n_days) > 0.95
+    df["anomaly_gas_price"] = rng.random(n_days) > 0.95
+    return df
@@ -1,21 +1,52 @@
-"""CryptoScanner package."""
-
-from .module_1_1 import ingest_binance_to_bq
-from .module_1_2 import run_indicator_job
-from .module_1_3 import run_decision_job
-from .module_2_1 import ingest_dune_to_bq
-from .module_2_1_1 import ingest_onchain_bigquery_to_bq
-from .module_2_2 import run_onchain_indicator_job
-from .module_2_3 import run_anomaly_job
-from .module_3_1 import alert_from_bigquery
-
-__all__ = [
-    "ingest_binance_to_bq",
-    "run_indicator_job",
-    "run_decision_job",
-    "ingest_dune_to_bq",
-    "ingest_onchain_bigquery_to_bq",
-    "run_onchain_indicator_job",
-    "run_anomaly_job",
-    "alert_from_bigquery",
-]
+"""CryptoScanner package.
+
+Public job functions are loaded lazily (PEP 562) so that importing the
+package, or running a single stage, only imports the modules that stage
+needs.
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+_EXPORTS = {
+    "ingest_binance_to_bq": ".module_1_1",
+    "run_indicator_job": ".module_1_2",
+    "run_decision_job": ".module_1_3",
+    "run_bar_job": ".module_1_4",
+    "run_screener_job": ".module_1_5",
+    "ingest_dune_to_bq": ".module_2_1",
+    "ingest_onchain_bigquery_to_bq": ".module_2_1_1",
+    "run_onchain_indicator_job": ".module_2_2",
+    "run_anomaly_job": ".module_2_3",
+    "alert_from_bigquery": ".module_3_1",
+    "run_compaction_job": ".module_4_1",
+}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from .module_1_1 import ingest_binance_to_bq
+    from .module_1_2 import run_indicator_job
+    from .module_1_3 import run_decision_job
+    from .module_1_4 import run_bar_job
+    from .module_1_5 import run_screener_job
+    from .module_2_1 import ingest_dune_to_bq
+    from .module_2_1_1 import ingest_onchain_bigquery_to_bq
+    from .module_2_2 import run_onchain_indicator_job
+    from .module_2_3 import run_anomaly_job
+    from .module_3_1 import alert_from_bigquery
+    from .module_4_1 import run_compaction_job
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(list(globals()) + __all__)
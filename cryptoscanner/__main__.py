@@ -0,0 +1,9 @@
+"""Allow ``python -m cryptoscanner [STAGE ...]``."""
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from .pipeline import main  # noqa: E402
+
+main()
@@ -0,0 +1,343 @@
+"""Vectorized backtesting of the moving-average decision rule.
+
+Historical market snapshots are resampled into a regular time x symbol
+price matrix. They are read from the raw metrics and their hourly rollup
+(see :mod:`cryptoscanner.module_4_1`), so compacted history contributes
+one price per symbol and hour. Only the last ``lookback_days`` of history
+are read, and the job resamples to hourly bars by default. For every configuration of the parameter grid
+the rule used by :func:`cryptoscanner.module_1_3.generate_decisions` (long
+when the fast MA is above the slow MA, short otherwise) is applied to all
+symbols at once with NumPy, and the equal-weight portfolio is scored by
+Sharpe ratio, maximum drawdown and turnover.
+
+Parameter sweeps run in a process pool. The price matrix and the arrays
+derived from it (cumulative sums, returns) are computed once in the parent
+and saved to ``.npy`` files that every worker memory-maps read-only, so they
+are shared through the page cache instead of being rebuilt or pickled in
+each process. Workers only allocate the per-configuration moving averages
+and signals, and the default pool size is capped so that these fit in the
+available memory.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from google.cloud import bigquery
+
+from .logger import get_logger
+from .bigquery_client import (
+    get_client,
+    query_dataframe,
+    ensure_table,
+    ensure_dataset,
+    write_dataframe,
+    validate_dataframe,
+)
+from .module_4_1 import ensure_rollup_tables, market_metrics_source, since_parameter
+
+LOGGER = get_logger(__name__)
+
+TABLE_SCHEMA = [
+    bigquery.SchemaField("fast", "INTEGER"),
+    bigquery.SchemaField("slow", "INTEGER"),
+    bigquery.SchemaField("threshold", "FLOAT"),
+    bigquery.SchemaField("total_return", "FLOAT"),
+    bigquery.SchemaField("sharpe", "FLOAT"),
+    bigquery.SchemaField("max_drawdown", "FLOAT"),
+    bigquery.SchemaField("turnover", "FLOAT"),
+    bigquery.SchemaField("timestamp", "TIMESTAMP"),
+]
+
+MINUTES_PER_YEAR = 365 * 24 * 60
+DEFAULT_LOOKBACK_DAYS = 30
+# Price-sized float64 arrays a worker holds while evaluating one config
+# (moving averages, signal and its temporaries, pnl, trades, equity).
+WORKER_ARRAYS = 8
+
+
+@dataclass(frozen=True)
+class Config:
+    """One point of the parameter grid."""
+
+    fast: int
+    slow: int
+    threshold: float = 0.0
+
+
+def param_grid(
+    fast_windows: Iterable[int],
+    slow_windows: Iterable[int],
+    thresholds: Iterable[float] = (0.0,),
+) -> List[Config]:
+    """Return every ``(fast, slow, threshold)`` combination with ``fast < slow``."""
+    return [
+        Config(fast, slow, threshold)
+        for fast, slow, threshold in itertools.product(fast_windows, slow_windows, thresholds)
+        if fast < slow
+    ]
+
+
+def build_price_matrix(df: pd.DataFrame, freq: str = "1min") -> Tuple[pd.DatetimeIndex, pd.Index, np.ndarray]:
+    """Resample raw snapshots into a regular time x symbol price matrix.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Raw metrics with ``symbol``, ``lastPrice`` and ``closeTime`` columns.
+    freq : str
+        Bar size. The last price in each bar is kept and gaps are forward
+        filled; prices before a symbol's first snapshot are NaN.
+
+    Returns
+    -------
+    tuple
+        Bar timestamps, symbols and a float64 array of shape
+        ``(n_bars, n_symbols)``.
+    """
+    bars = df.assign(bar=pd.to_datetime(df["closeTime"]).dt.floor(freq))
+    wide = bars.pivot_table(index="bar", columns="symbol", values="lastPrice", aggfunc="last", observed=True)
+    wide = wide.asfreq(freq).ffill()
+    return wide.index, wide.columns, np.ascontiguousarray(wide.to_numpy(dtype=np.float64))
+
+
+class _Prepared:
+    """Arrays derived from the price matrix, shared by every configuration."""
+
+    FIELDS = ("prices", "csum", "count", "returns", "active", "n_active")
+
+    def __init__(self, **arrays: np.ndarray) -> None:
+        for name in self.FIELDS:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    def from_prices(cls, prices: np.ndarray) -> "_Prepared":
+        valid = np.isfinite(prices)
+        zero = np.zeros((1, prices.shape[1]))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = prices[1:] / prices[:-1] - 1.0
+        active = np.isfinite(returns)
+        return cls(
+            prices=prices,
+            csum=np.concatenate([zero, np.cumsum(np.where(valid, prices, 0.0), axis=0)]),
+            count=np.concatenate([zero, np.cumsum(valid, axis=0)]),
+            returns=np.where(active, returns, 0.0),
+            active=active,
+            n_active=active.sum(axis=1),
+        )
+
+    def save(self, directory: str) -> None:
+        """Write every array to ``<directory>/<field>.npy``."""
+        for name in self.FIELDS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, directory: str) -> "_Prepared":
+        """Memory-map the arrays written by :meth:`save`."""
+        return cls(**{name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in cls.FIELDS})
+
+    def moving_average(self, window: int) -> np.ndarray:
+        """Trailing mean over ``window`` bars, NaN until the window is full."""
+        n = self.prices.shape[0]
+        ma = np.full(self.prices.shape, np.nan)
+        if window > n:
+            return ma
+        total = self.csum[window:] - self.csum[:-window]
+        full = (self.count[window:] - self.count[:-window]) == window
+        ma[window - 1:] = np.where(full, total / window, np.nan)
+        return ma
+
+
+def evaluate(prepared: _Prepared, config: Config, periods_per_year: float = MINUTES_PER_YEAR) -> Dict[str, float]:
+    """Backtest one configuration on all symbols at once.
+
+    Positions are decided on the close of bar ``t`` and earn the return of
+    bar ``t + 1``. Symbols without data for a bar are left out of that
+    bar's equal-weight average.
+    """
+    fast = prepared.moving_average(config.fast)
+    slow = prepared.moving_average(config.slow)
+    with np.errstate(invalid="ignore"):
+        signal = np.where(fast > slow * (1 + config.threshold), 1.0, 0.0)
+        signal = np.where(fast < slow * (1 - config.threshold), -1.0, signal)
+    signal[~np.isfinite(fast) | ~np.isfinite(slow)] = 0.0
+
+    position = signal[:-1]
+    pnl = position * prepared.returns
+    n_active = prepared.n_active
+    portfolio = np.divide(pnl.sum(axis=1), n_active, out=np.zeros(len(n_active)), where=n_active > 0)
+
+    trades = np.abs(np.diff(signal, axis=0, prepend=0.0))
+    equity = np.cumprod(1.0 + portfolio)
+    drawdown = 1.0 - equity / np.maximum.accumulate(equity) if len(equity) else np.zeros(1)
+    std = portfolio.std()
+    return {
+        "fast": config.fast,
+        "slow": config.slow,
+        "threshold": config.threshold,
+        "total_return": float(equity[-1] - 1.0) if len(equity) else 0.0,
+        "sharpe": float(portfolio.mean() / std * np.sqrt(periods_per_year)) if std > 0 else 0.0,
+        "max_drawdown": float(drawdown.max()),
+        "turnover": float(trades.sum(axis=0).mean() / max(len(trades), 1)),
+    }
+
+
+def _available_memory() -> Optional[int]:
+    """Return the free physical memory in bytes, or ``None`` if unknown."""
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def default_workers(prices: np.ndarray) -> int:
+    """Return a pool size that fits both the CPUs and the available memory."""
+    workers = os.cpu_count() or 1
+    available = _available_memory()
+    if available is not None:
+        workers = min(workers, available // max(prices.nbytes * WORKER_ARRAYS, 1))
+    return max(int(workers), 1)
+
+
+_WORKER: Optional[_Prepared] = None
+_WORKER_PERIODS: float = MINUTES_PER_YEAR
+
+
+def _init_worker(directory: str, periods_per_year: float) -> None:
+    global _WORKER, _WORKER_PERIODS
+    _WORKER = _Prepared.load(directory)
+    _WORKER_PERIODS = periods_per_year
+
+
+def _evaluate_in_worker(config: Config) -> Dict[str, float]:
+    return evaluate(_WORKER, config, _WORKER_PERIODS)
+
+
+def run_sweep(
+    prices: np.ndarray,
+    configs: List[Config],
+    max_workers: Optional[int] = None,
+    periods_per_year: float = MINUTES_PER_YEAR,
+) -> pd.DataFrame:
+    """Evaluate every configuration and return one report row per config.
+
+    Parameters
+    ----------
+    prices : np.ndarray
+        Price matrix from :func:`build_price_matrix`.
+    configs : list of Config
+        Grid to evaluate, e.g. from :func:`param_grid`.
+    max_workers : int, optional
+        Worker processes. Defaults to :func:`default_workers`, the CPU count
+        capped by the available memory; ``1`` runs in-process.
+    periods_per_year : float
+        Bars per year, used to annualise the Sharpe ratio.
+
+    Returns
+    -------
+    pd.DataFrame
+        Report sorted by descending Sharpe ratio.
+    """
+    max_workers = max_workers or default_workers(prices)
+    LOGGER.info("Backtesting %d configs on %s prices with %d workers", len(configs), prices.shape, max_workers)
+    prepared = _Prepared.from_prices(prices)
+    if max_workers == 1:
+        rows = [evaluate(prepared, config, periods_per_year) for config in configs]
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            prepared.save(tmp)
+            del prepared  # workers map their own read-only copies
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_worker,
+                initargs=(tmp, periods_per_year),
+            ) as pool:
+                rows = list(pool.map(_evaluate_in_worker, configs))
+    return pd.DataFrame(rows).sort_values("sharpe", ascending=False, ignore_index=True)
+
+
+def run_backtest_job(
+    configs: Optional[List[Config]] = None,
+    freq: str = "1h",
+    max_workers: Optional[int] = None,
+    lookback_days: int = DEFAULT_LOOKBACK_DAYS,
+    project_id: str = "starlit-verve-458814-u9",
+    dataset: str = "cryptoscanner",
+) -> pd.DataFrame:
+    """Backtest a parameter grid on historical market data and store the report.
+
+    Parameters
+    ----------
+    configs : list of Config, optional
+        Grid to evaluate. Defaults to MA windows around the production
+        ``ma5``/``ma20`` pair.
+    freq : str
+        Bar size used to regularise the raw snapshots. Finer bars multiply
+        the size of the price matrix, e.g. ``"1min"`` is 60 times ``"1h"``.
+    max_workers : int, optional
+        Worker processes for the sweep.
+    lookback_days : int
+        Days of history to backtest on.
+    project_id : str
+        GCP project identifier.
+    dataset : str
+        BigQuery dataset name.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per configuration, best Sharpe first.
+    """
+    if lookback_days < 1:
+        raise ValueError(f"lookback_days must be at least 1, got {lookback_days}")
+    configs = configs or param_grid((3, 5, 10), (20, 50, 100), (0.0, 0.001))
+    LOGGER.info("Running backtest job")
+    client = get_client(project_id)
+    ensure_dataset(client, dataset)
+    raw_table = f"{project_id}.{dataset}.market_raw_metrics"
+    report_table = f"{project_id}.{dataset}.market_backtest_results"
+    ensure_table(client, report_table, TABLE_SCHEMA)
+
+    ensure_rollup_tables(client, project_id, dataset)
+    since = pd.Timestamp.now("UTC") - pd.Timedelta(days=lookback_days)
+    df_raw = query_dataframe(
+        f"SELECT symbol, lastPrice, closeTime FROM {market_metrics_source(project_id, dataset, since='@since')}",
+        client,
+        [since_parameter(since)],
+        name=raw_table,
+        downcast_floats=True,
+    )
+    _, _, prices = build_price_matrix(df_raw, freq)
+    periods_per_year = pd.Timedelta(days=365) / pd.Timedelta(freq)
+    report = run_sweep(prices, configs, max_workers, periods_per_year)
+    report["timestamp"] = pd.Timestamp.now("UTC")
+    write_dataframe(validate_dataframe(report, TABLE_SCHEMA), report_table, client)
+    LOGGER.info("Wrote backtest report to %s", report_table)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Backtest the MA crossover rule over a parameter grid.")
+    parser.add_argument("--fast", type=int, nargs="+", default=[3, 5, 10])
+    parser.add_argument("--slow", type=int, nargs="+", default=[20, 50, 100])
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.0, 0.001])
+    parser.add_argument("--freq", default="1h")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--days", type=int, default=DEFAULT_LOOKBACK_DAYS, help="days of history to backtest on")
+    args = parser.parse_args(argv)
+    report = run_backtest_job(
+        param_grid(args.fast, args.slow, args.thresholds), args.freq, args.workers, args.days
+    )
+    print(report.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
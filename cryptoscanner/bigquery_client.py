@@ -3,37 +3,79 @@
 This module provides helper functions to create a connection using
 Application Default Credentials (ADC), ensure a dataset and table exist,
 and read/write Pandas DataFrames to BigQuery.
+
+With ``CRYPTOSCANNER_COMPACT_DTYPES=1`` frames read from BigQuery use a
+compact representation: repeated string keys are dictionary encoded
+(pandas ``category``), other strings are Arrow-backed and NUMERIC becomes
+float64. Readers whose results are only analysed, never stored, can also
+ask for price-like columns as float32 (``downcast_floats``); float32
+rounding must not reach a table. :func:`write_dataframe` converts back to
+BigQuery-compatible dtypes before loading.
 """
 
 from __future__ import annotations
 
 from .logger import get_logger
-from typing import Optional
+from . import metrics
+from typing import Dict, Iterator, Optional
 import os
+import threading
 
 from google.cloud import bigquery
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
 LOGGER = get_logger(__name__)
 
 DEFAULT_PROJECT = "starlit-verve-458814-u9"
 DEFAULT_DATASET = "cryptoscanner"
+DEFAULT_PAGE_SIZE = 10_000
+
+COMPACT_DTYPES_ENV = "CRYPTOSCANNER_COMPACT_DTYPES"
+# Low-cardinality keys repeated on every row.
+CATEGORICAL_COLUMNS = ("symbol", "address", "source", "decision", "metric")
+# Columns whose values only need ~7 significant digits. Columns that are
+# summed over many rows (e.g. ``eth_transferred``) stay float64.
+FLOAT32_COLUMNS = ("lastPrice", "priceChangePercent", "ma5", "ma20", "gas_price_gwei")
+
+# Process-wide caches so that a long-running process authenticates once per
+# project and checks each dataset/table only once.
+_CLIENTS: Dict[str, bigquery.Client] = {}
+_DATASETS: Dict[str, bigquery.Dataset] = {}
+_TABLES: Dict[str, bigquery.Table] = {}
+_CACHE_LOCK = threading.Lock()
 
 
 def get_client(project_id: str = DEFAULT_PROJECT) -> bigquery.Client:
     """Return a BigQuery client using Application Default Credentials.
 
     Any ``GOOGLE_APPLICATION_CREDENTIALS`` environment variable will be
-    ignored to enforce IAM-based authentication.
+    ignored to enforce IAM-based authentication. Clients are cached per
+    project and reused by later calls.
     """
-    LOGGER.debug("Creating BigQuery client for project %s", project_id)
-    os.environ.pop("GOOGLE_APPLICATION_CREDENTIALS", None)
-    return bigquery.Client(project=project_id)
+    with _CACHE_LOCK:
+        client = _CLIENTS.get(project_id)
+        if client is None:
+            LOGGER.debug("Creating BigQuery client for project %s", project_id)
+            os.environ.pop("GOOGLE_APPLICATION_CREDENTIALS", None)
+            client = _CLIENTS[project_id] = bigquery.Client(project=project_id)
+    return client
+
+
+def reset_caches() -> None:
+    """Drop cached clients, datasets and tables."""
+    with _CACHE_LOCK:
+        _CLIENTS.clear()
+        _DATASETS.clear()
+        _TABLES.clear()
 
 
 def ensure_dataset(client: bigquery.Client, dataset_name: str = DEFAULT_DATASET) -> bigquery.Dataset:
     """Create the dataset if it does not exist and return it."""
     dataset_id = f"{client.project}.{dataset_name}"
+    if dataset_id in _DATASETS:
+        return _DATASETS[dataset_id]
     try:
         dataset = client.get_dataset(dataset_id)
         LOGGER.debug("Dataset %s already exists", dataset_id)
@@ -42,6 +84,7 @@ def ensure_dataset(client: bigquery.Client, dataset_name: str = DEFAULT_DATASET)
         dataset = bigquery.Dataset(dataset_id)
         dataset.location = "US"
         dataset = client.create_dataset(dataset, exists_ok=True)
+    _DATASETS[dataset_id] = dataset
     return dataset
 
 
@@ -49,15 +92,31 @@ def ensure_table(
     client: bigquery.Client,
     table_id: str,
     schema: list[bigquery.SchemaField],
+    partition_field: Optional[str] = None,
+    clustering_fields: Optional[list[str]] = None,
 ) -> bigquery.Table:
-    """Create a table if it does not exist and return it."""
+    """Create a table if it does not exist and return it.
+
+    New tables are partitioned by day on the ``partition_field`` timestamp
+    and clustered on ``clustering_fields`` when given, so that filters on
+    those columns prune the scan. Existing tables are left as they are.
+    """
+    if table_id in _TABLES:
+        return _TABLES[table_id]
     try:
         table = client.get_table(table_id)
         LOGGER.debug("Table %s already exists", table_id)
     except Exception:
         LOGGER.info("Creating table %s", table_id)
         table = bigquery.Table(table_id, schema=schema)
+        if partition_field:
+            table.time_partitioning = bigquery.TimePartitioning(
+                type_=bigquery.TimePartitioningType.DAY, field=partition_field
+            )
+        if clustering_fields:
+            table.clustering_fields = clustering_fields
         table = client.create_table(table, exists_ok=True)
+    _TABLES[table_id] = table
     return table
 
 
@@ -72,6 +131,66 @@ def validate_dataframe(df: pd.DataFrame, schema: list[bigquery.SchemaField]) ->
     return df[expected]
 
 
+def compact_enabled() -> bool:
+    """Return True if the compact dtype mode is switched on."""
+    return os.getenv(COMPACT_DTYPES_ENV, "").lower() in ("1", "true", "yes")
+
+
+def compact_arrow_table(table: pa.Table, downcast_floats: bool = False) -> pa.Table:
+    """Return ``table`` with compact column types.
+
+    ``CATEGORICAL_COLUMNS`` are dictionary encoded; BYTES keys are encoded
+    first and only the distinct values are converted to hex strings.
+    NUMERIC columns are cast to float64, and with ``downcast_floats``
+    ``FLOAT32_COLUMNS`` to float32.
+    """
+    columns = []
+    for name, column in zip(table.column_names, table.columns):
+        if pa.types.is_decimal(column.type):
+            column = pc.cast(column, pa.float64())
+        if name in CATEGORICAL_COLUMNS and (pa.types.is_string(column.type) or pa.types.is_binary(column.type)):
+            column = column.combine_chunks().dictionary_encode()
+            if pa.types.is_binary(column.type.value_type):
+                hex_values = pa.array([v.hex() if v is not None else None for v in column.dictionary.to_pylist()], pa.string())
+                column = pa.DictionaryArray.from_arrays(column.indices, hex_values)
+        elif downcast_floats and name in FLOAT32_COLUMNS and pa.types.is_floating(column.type):
+            column = pc.cast(column, pa.float32())
+        columns.append(column)
+    return pa.table(columns, names=table.column_names)
+
+
+def to_bigquery_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Expand compact dtypes back to types the BigQuery loader accepts.
+
+    Categoricals become plain strings and float32 columns float64. The
+    frame is returned unchanged if nothing needs converting.
+    """
+    convert = {}
+    for col in df.columns:
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            convert[col] = dtype.categories.dtype
+        elif dtype == "float32":
+            convert[col] = "float64"
+    return df.astype(convert) if convert else df
+
+
+def compact_to_pandas(table: pa.Table, downcast_floats: bool = False) -> pd.DataFrame:
+    """Convert an Arrow table to a DataFrame with compact dtypes.
+
+    Applies :func:`compact_arrow_table` and keeps the remaining strings
+    Arrow-backed.
+    """
+    table = compact_arrow_table(table, downcast_floats)
+    return table.to_pandas(types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get)
+
+
+def _job_to_dataframe(job, compact: bool, downcast_floats: bool = False) -> pd.DataFrame:
+    if not compact:
+        return job.to_dataframe()
+    return compact_to_pandas(job.to_arrow(), downcast_floats)
+
+
 def write_dataframe(
     df: pd.DataFrame,
     table_id: str,
@@ -83,13 +202,174 @@ def write_dataframe(
     job_config = bigquery.LoadJobConfig(write_disposition="WRITE_APPEND")
     if if_exists == "replace":
         job_config.write_disposition = "WRITE_TRUNCATE"
+    df = to_bigquery_dtypes(df)
     LOGGER.info("Writing %d rows to %s", len(df), table_id)
-    client.load_table_from_dataframe(df, table_id, job_config=job_config).result()
+    with metrics.track(table_id, "write") as record:
+        record.rows_in = len(df)
+        job = client.load_table_from_dataframe(df, table_id, job_config=job_config)
+        job.result()
+        metrics.record_job(record, job)
 
 
-def read_dataframe(table_id: str, client: Optional[bigquery.Client] = None) -> pd.DataFrame:
-    """Read a table from BigQuery into a DataFrame."""
-    client = client or get_client()
+def read_dataframe(
+    table_id: str,
+    client: Optional[bigquery.Client] = None,
+    compact: Optional[bool] = None,
+    downcast_floats: bool = False,
+) -> pd.DataFrame:
+    """Read a table from BigQuery into a DataFrame.
+
+    ``compact`` defaults to the ``CRYPTOSCANNER_COMPACT_DTYPES`` setting;
+    see :func:`query_dataframe` for ``downcast_floats``.
+    """
     LOGGER.debug("Reading table %s", table_id)
+    return query_dataframe(
+        f"SELECT * FROM `{table_id}`", client, name=table_id, compact=compact, downcast_floats=downcast_floats
+    )
+
+
+def query_dataframe(
+    query: str,
+    client: Optional[bigquery.Client] = None,
+    params: Optional[list] = None,
+    name: str = "query",
+    compact: Optional[bool] = None,
+    downcast_floats: bool = False,
+) -> pd.DataFrame:
+    """Run a query and return its result as a DataFrame.
+
+    Parameters
+    ----------
+    query : str
+        Standard SQL, optionally with ``@name`` parameters.
+    client : bigquery.Client, optional
+        Client to use. A new one is created if omitted.
+    params : list of bigquery.ScalarQueryParameter, optional
+        Query parameters.
+    name : str
+        Name the read is recorded under in :mod:`cryptoscanner.metrics`.
+    compact : bool, optional
+        Use compact dtypes. Defaults to ``CRYPTOSCANNER_COMPACT_DTYPES``.
+    downcast_floats : bool
+        In compact mode, also read ``FLOAT32_COLUMNS`` as float32. Only for
+        results that are analysed and not written back, since the rounding
+        would be stored.
+    """
+    client = client or get_client()
+    compact = compact_enabled() if compact is None else compact
+    job_config = bigquery.QueryJobConfig(query_parameters=params or [])
+    with metrics.track(name, "read") as record:
+        job = client.query(query, job_config=job_config)
+        df = _job_to_dataframe(job, compact, downcast_floats)
+        metrics.record_frame(record, df)
+        metrics.record_job(record, job)
+    return df
+
+
+def run_query(
+    query: str,
+    client: Optional[bigquery.Client] = None,
+    params: Optional[list] = None,
+    name: str = "query",
+) -> None:
+    """Run a DML statement or script and wait for it to finish."""
+    client = client or get_client()
+    job_config = bigquery.QueryJobConfig(query_parameters=params or [])
+    with metrics.track(name, "write") as record:
+        job = client.query(query, job_config=job_config)
+        job.result()
+        affected = getattr(job, "num_dml_affected_rows", None)
+        record.rows_in = affected if isinstance(affected, int) else 0
+        metrics.record_job(record, job)
+
+
+def merge_dataframe(
+    df: pd.DataFrame,
+    table_id: str,
+    schema: list[bigquery.SchemaField],
+    keys: list[str],
+    client: Optional[bigquery.Client] = None,
+    update_exprs: Optional[Dict[str, str]] = None,
+) -> None:
+    """Upsert ``df`` into ``table_id`` on ``keys``.
+
+    The frame is loaded into ``<table_id>_staging`` and merged with a single
+    ``MERGE`` statement. Matched rows are updated with ``update_exprs``
+    (SQL over target ``T`` and staging ``S``), defaulting to ``S.<column>``;
+    unmatched rows are inserted.
+    """
+    client = client or get_client()
+    staging_id = f"{table_id}_staging"
+    ensure_table(client, staging_id, schema)
+    write_dataframe(df, staging_id, client, if_exists="replace")
+    update_exprs = update_exprs or {}
+    columns = [field.name for field in schema]
+    on = " AND ".join(f"T.`{key}` = S.`{key}`" for key in keys)
+    updates = ", ".join(
+        f"`{col}` = {update_exprs.get(col, f'S.`{col}`')}" for col in columns if col not in keys
+    )
+    names = ", ".join(f"`{col}`" for col in columns)
+    values = ", ".join(f"S.`{col}`" for col in columns)
+    query = (
+        f"MERGE `{table_id}` T USING `{staging_id}` S ON {on} "
+        f"WHEN MATCHED THEN UPDATE SET {updates} "
+        f"WHEN NOT MATCHED THEN INSERT ({names}) VALUES ({values})"
+    )
+    LOGGER.info("Merging %d rows into %s", len(df), table_id)
+    run_query(query, client, name=table_id)
+
+
+def iter_record_batches(
+    table_id: str,
+    client: Optional[bigquery.Client] = None,
+    since: Optional[pd.Timestamp] = None,
+    since_column: str = "timestamp",
+    limit: Optional[int] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+) -> Iterator[pa.RecordBatch]:
+    """Stream a table from BigQuery as Arrow record batches.
+
+    Rows are fetched page by page so that only one page is held in memory
+    at a time.
+
+    Parameters
+    ----------
+    table_id : str
+        Fully qualified table identifier.
+    client : bigquery.Client, optional
+        Client to use. A new one is created if omitted.
+    since : pd.Timestamp, optional
+        Only return rows where ``since_column`` is at or after this value.
+    since_column : str
+        Timestamp column used by the ``since`` filter.
+    limit : int, optional
+        Maximum number of rows to return. The newest rows by
+        ``since_column`` are kept.
+    page_size : int
+        Number of rows fetched per page.
+
+    Yields
+    ------
+    pa.RecordBatch
+        One batch per fetched page.
+    """
+    client = client or get_client()
     query = f"SELECT * FROM `{table_id}`"
-    return client.query(query).to_dataframe()
+    params = []
+    if since is not None:
+        query += f" WHERE `{since_column}` >= @since"
+        params.append(
+            bigquery.ScalarQueryParameter("since", "TIMESTAMP", pd.Timestamp(since).to_pydatetime())
+        )
+    if limit is not None:
+        query += f" ORDER BY `{since_column}` DESC LIMIT {int(limit)}"
+    LOGGER.debug("Streaming table %s", table_id)
+    job_config = bigquery.QueryJobConfig(query_parameters=params)
+    with metrics.track(table_id, "read") as record:
+        job = client.query(query, job_config=job_config)
+        rows = job.result(page_size=page_size)
+        metrics.record_job(record, job)
+        for batch in rows.to_arrow_iterable():
+            record.rows_out += batch.num_rows
+            record.bytes_transferred += batch.nbytes
+            yield batch
@@ -0,0 +1,203 @@
+"""Resident service mode that runs each stage on its own interval.
+
+A single long-lived process keeps the imported modules, the cached
+BigQuery clients and the verified dataset/table registry of
+:mod:`cryptoscanner.bigquery_client` warm between runs, so each cycle
+only pays for its actual work.
+
+Stages still respect the ``depends_on`` of :data:`cryptoscanner.pipeline.STAGES`:
+a due stage waits while one of its dependencies is running or due, and is
+skipped while the last run of a dependency has failed.
+"""
+
+from __future__ import annotations
+
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+from . import metrics
+from .logger import get_logger
+from .pipeline import STAGES, run_stage
+
+LOGGER = get_logger(__name__)
+
+# Seconds between two runs of each stage.
+DEFAULT_INTERVALS: Dict[str, float] = {
+    "ingest": 60,
+    "screen": 300,
+    "bars": 60,
+    "indicators": 300,
+    "decisions": 300,
+    "onchain_ingest": 3600,
+    "anomalies": 3600,
+    "alerting": 3600,
+    "compaction": 86400,
+}
+
+OVERLAP_POLICIES = ("skip", "queue")
+
+# How soon a stage waiting on a dependency is checked again.
+DEPENDENCY_POLL_SECONDS = 1.0
+
+
+class Daemon:
+    """Schedule pipeline stages at fixed intervals in one process.
+
+    Parameters
+    ----------
+    jobs : dict
+        Stage name to job function.
+    intervals : dict
+        Stage name to interval in seconds. Stages without an entry use
+        :data:`DEFAULT_INTERVALS`.
+    overlap : str
+        What to do when a stage is due while its previous run is still
+        going: ``skip`` drops the run, ``queue`` runs it once as soon as
+        the previous one finishes.
+    metrics_dir : str, optional
+        Directory where metrics are exported after every stage run.
+    depends_on : dict, optional
+        Stage name to the stages it depends on. Defaults to the
+        ``depends_on`` of :data:`cryptoscanner.pipeline.STAGES`;
+        dependencies that are not scheduled are ignored.
+    """
+
+    def __init__(
+        self,
+        jobs: Dict[str, Callable[[], Any]],
+        intervals: Optional[Dict[str, float]] = None,
+        overlap: str = "skip",
+        metrics_dir: Optional[str] = None,
+        depends_on: Optional[Dict[str, Sequence[str]]] = None,
+    ) -> None:
+        if overlap not in OVERLAP_POLICIES:
+            raise ValueError(f"overlap must be one of {OVERLAP_POLICIES}")
+        intervals = intervals or {}
+        self.jobs = jobs
+        self.intervals = {name: float(intervals.get(name, DEFAULT_INTERVALS.get(name, 300))) for name in jobs}
+        self.overlap = overlap
+        self.metrics_dir = metrics_dir
+        if depends_on is None:
+            depends_on = {name: STAGES[name].depends_on for name in jobs if name in STAGES}
+        self.depends_on = {name: [dep for dep in depends_on.get(name, ()) if dep in jobs] for name in jobs}
+        self._next_due = {name: 0.0 for name in jobs}
+        self._running: Set[str] = set()
+        self._failed: Set[str] = set()
+        self._queued: Set[str] = set()
+        self._latest: Dict[str, List[metrics.StageMetrics]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=len(jobs) or 1, thread_name_prefix="cryptoscanner")
+
+    def _submit(self, name: str) -> None:
+        self._running.add(name)
+        self._executor.submit(self._run, name)
+
+    def _run(self, name: str) -> None:
+        failed = False
+        try:
+            run_stage(name, self.jobs[name])
+        except Exception as exc:
+            failed = True
+            LOGGER.error("Stage %s failed: %s", name, exc)
+        finally:
+            self._export(name)
+            with self._lock:
+                self._running.discard(name)
+                if failed:
+                    self._failed.add(name)
+                else:
+                    self._failed.discard(name)
+                if name in self._queued and not self._stop.is_set():
+                    self._queued.discard(name)
+                    self._submit(name)
+
+    def _export(self, name: str) -> None:
+        records = metrics.pop_stage(name)
+        if not self.metrics_dir:
+            return
+        with self._lock:
+            self._latest[name] = records
+            latest = [r for items in self._latest.values() for r in items]
+        # One report per stage, overwritten by each run.
+        run_id = f"{name}_{time.strftime('%Y%m%dT%H%M%S')}"
+        metrics.export(self.metrics_dir, run_id, latest, report_name=name, report_items=records)
+
+    def tick(self, now: float) -> float:
+        """Start every stage that is due at ``now`` and whose dependencies allow it.
+
+        Stages are visited in pipeline order. A due stage waits while one of
+        its dependencies is running or waiting itself, and is skipped while
+        the last run of a dependency failed.
+
+        Returns
+        -------
+        float
+            Seconds until the next stage is due or a waiting stage is checked
+            again.
+        """
+        with self._lock:
+            waiting: Set[str] = set()
+            for name, due in self._next_due.items():
+                if now < due:
+                    continue
+                deps = self.depends_on[name]
+                if any(dep in self._running or dep in waiting for dep in deps):
+                    waiting.add(name)
+                    continue
+                # Schedule from now rather than from ``due`` so that a slow
+                # cycle does not trigger a burst of catch-up runs.
+                self._next_due[name] = now + self.intervals[name]
+                failed = [dep for dep in deps if dep in self._failed]
+                if failed:
+                    LOGGER.warning("Skipping stage %s: dependency %s failed", name, ", ".join(failed))
+                elif name not in self._running:
+                    self._submit(name)
+                elif self.overlap == "queue":
+                    LOGGER.info("Stage %s still running, queued next run", name)
+                    self._queued.add(name)
+                else:
+                    LOGGER.warning("Stage %s still running, skipped this run", name)
+            if waiting:
+                return DEPENDENCY_POLL_SECONDS
+            return max(0.0, min(self._next_due.values(), default=now) - now)
+
+    def stop(self, *_: Any) -> None:
+        """Ask the scheduler loop to exit after the current wait."""
+        LOGGER.info("Stopping daemon")
+        self._stop.set()
+
+    def shutdown(self) -> None:
+        """Drop queued runs and wait for running stages to finish."""
+        self._stop.set()
+        with self._lock:
+            self._queued.clear()
+        self._executor.shutdown(wait=True)
+
+    def run_forever(self) -> None:
+        """Run the scheduler until SIGINT or SIGTERM, then shut down cleanly."""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+        LOGGER.info("Daemon started with intervals %s", self.intervals)
+        try:
+            while not self._stop.is_set():
+                self._stop.wait(self.tick(time.monotonic()))
+        finally:
+            self.shutdown()
+            LOGGER.info("Daemon stopped")
+
+
+def run_daemon(
+    names: Optional[List[str]] = None,
+    intervals: Optional[Dict[str, float]] = None,
+    overlap: str = "skip",
+    metrics_dir: Optional[str] = None,
+) -> None:
+    """Import the selected stages once and schedule them until stopped."""
+    names = names or list(STAGES)
+    jobs = {name: STAGES[name].load() for name in STAGES if name in names}
+    Daemon(jobs, intervals, overlap, metrics_dir).run_forever()
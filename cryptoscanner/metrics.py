@@ -0,0 +1,234 @@
+"""Per-stage metrics collection and export.
+
+Every instrumented operation (pipeline stage, BigQuery read or write, HTTP
+fetch) is recorded as a :class:`StageMetrics` in an in-process registry.
+Operations nested inside a stage roll their rows, bytes and BigQuery job
+statistics up into it. At the end of a run the registry is exported as a
+Prometheus textfile and a JSON report.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from .logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+METRIC_PREFIX = "cryptoscanner"
+
+_RECORDS: List["StageMetrics"] = []
+_LOCK = threading.Lock()
+_CURRENT: contextvars.ContextVar[Optional["StageMetrics"]] = contextvars.ContextVar(
+    "cryptoscanner_current_stage", default=None
+)
+
+
+@dataclass
+class StageMetrics:
+    """Measurements for one instrumented operation."""
+
+    name: str
+    kind: str
+    stage: str
+    status: str = "ok"
+    started_at: float = 0.0
+    wall_seconds: float = 0.0
+    rows_in: int = 0
+    rows_out: int = 0
+    bytes_transferred: int = 0
+    total_bytes_processed: int = 0
+    total_bytes_billed: int = 0
+    slot_millis: int = 0
+    jobs: int = 0
+    cache_hits: int = 0
+    job_ids: List[str] = field(default_factory=list)
+
+
+def _as_int(value: Any) -> int:
+    return value if isinstance(value, int) and not isinstance(value, bool) else 0
+
+
+def record_job(record: StageMetrics, job: Any) -> None:
+    """Add the statistics of a finished BigQuery job to ``record``.
+
+    Works for both query and load jobs; statistics a job type does not
+    report are counted as zero.
+    """
+    slot_millis = getattr(job, "slot_millis", None)
+    if slot_millis is None:
+        stats = getattr(job, "_properties", {}).get("statistics", {})
+        slot_millis = int(stats.get("totalSlotMs", 0) or 0) if isinstance(stats, dict) else 0
+    record.jobs += 1
+    record.total_bytes_processed += _as_int(getattr(job, "total_bytes_processed", None))
+    record.total_bytes_billed += _as_int(getattr(job, "total_bytes_billed", None))
+    record.bytes_transferred += _as_int(getattr(job, "output_bytes", None))
+    record.slot_millis += _as_int(slot_millis)
+    if getattr(job, "cache_hit", None) is True:
+        record.cache_hits += 1
+    job_id = getattr(job, "job_id", None)
+    if isinstance(job_id, str):
+        record.job_ids.append(job_id)
+
+
+def record_frame(record: StageMetrics, df: Any) -> None:
+    """Add the rows and in-memory size of a DataFrame read into ``record``.
+
+    Query jobs do not report how many bytes they returned, so reads count
+    the memory of the materialised result instead.
+    """
+    record.rows_out += len(df)
+    record.bytes_transferred += int(df.memory_usage(index=False, deep=True).sum())
+
+
+def _roll_up(parent: StageMetrics, child: StageMetrics) -> None:
+    if child.kind in ("read", "http"):
+        parent.rows_in += child.rows_out
+    elif child.kind == "write":
+        parent.rows_out += child.rows_in
+    for attr in ("bytes_transferred", "total_bytes_processed", "total_bytes_billed", "slot_millis", "jobs", "cache_hits"):
+        setattr(parent, attr, getattr(parent, attr) + getattr(child, attr))
+    parent.job_ids.extend(child.job_ids)
+
+
+@contextmanager
+def track(name: str, kind: str = "stage") -> Iterator[StageMetrics]:
+    """Record wall time and counters for the enclosed block.
+
+    Parameters
+    ----------
+    name : str
+        Name of the operation, e.g. a stage name or a table id.
+    kind : str
+        One of ``stage``, ``read``, ``write`` or ``http``.
+
+    Yields
+    ------
+    StageMetrics
+        Record to fill with rows, bytes and jobs while the block runs.
+    """
+    parent = _CURRENT.get()
+    stage = name if kind == "stage" or parent is None else parent.stage
+    record = StageMetrics(name=name, kind=kind, stage=stage, started_at=time.time())
+    # Only stages become the current parent: leaf operations may be held
+    # open across generator yields, where a context change would leak.
+    token = _CURRENT.set(record) if kind == "stage" else None
+    start = time.perf_counter()
+    try:
+        yield record
+    except GeneratorExit:
+        # A consumer stopping a generator early is a normal exit.
+        raise
+    except BaseException:
+        record.status = "error"
+        raise
+    finally:
+        record.wall_seconds = time.perf_counter() - start
+        if token is not None:
+            _CURRENT.reset(token)
+        with _LOCK:
+            if parent is not None:
+                _roll_up(parent, record)
+            _RECORDS.append(record)
+
+
+def records() -> List[StageMetrics]:
+    """Return the operations recorded since the last :func:`reset`."""
+    with _LOCK:
+        return list(_RECORDS)
+
+
+def reset() -> None:
+    """Clear all recorded metrics, typically at the start of a run."""
+    with _LOCK:
+        _RECORDS.clear()
+
+
+def pop_stage(stage: str) -> List[StageMetrics]:
+    """Remove and return the records belonging to ``stage``.
+
+    Used by long-running processes, where the registry would otherwise
+    grow without bound.
+    """
+    with _LOCK:
+        popped = [r for r in _RECORDS if r.stage == stage]
+        _RECORDS[:] = [r for r in _RECORDS if r.stage != stage]
+    return popped
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_PROMETHEUS_FIELDS = {
+    "wall_seconds": "Wall time spent in the operation.",
+    "rows_in": "Rows read or received by the operation.",
+    "rows_out": "Rows returned or written by the operation.",
+    "bytes_transferred": "Bytes downloaded or loaded by the operation.",
+    "total_bytes_processed": "BigQuery bytes processed by the operation's jobs.",
+    "total_bytes_billed": "BigQuery bytes billed for the operation's jobs.",
+    "slot_millis": "BigQuery slot milliseconds consumed by the operation's jobs.",
+    "jobs": "Number of BigQuery jobs run by the operation.",
+    "cache_hits": "Number of BigQuery jobs answered from the query cache.",
+}
+
+
+def to_prometheus(items: Optional[List[StageMetrics]] = None) -> str:
+    """Render records in the Prometheus text exposition format."""
+    items = records() if items is None else items
+    lines: List[str] = []
+    for attr, help_text in {**_PROMETHEUS_FIELDS, "success": "1 if the operation succeeded."}.items():
+        metric = f"{METRIC_PREFIX}_{attr}"
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} gauge")
+        for r in items:
+            value = int(r.status == "ok") if attr == "success" else getattr(r, attr)
+            labels = f'stage="{_label(r.stage)}",kind="{_label(r.kind)}",name="{_label(r.name)}"'
+            lines.append(f"{metric}{{{labels}}} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def to_report(run_id: str, items: Optional[List[StageMetrics]] = None) -> Dict[str, Any]:
+    """Return a JSON-serialisable report of the run."""
+    items = records() if items is None else items
+    return {"run_id": run_id, "operations": [asdict(r) for r in items]}
+
+
+def _write_atomic(path: str, text: str) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as fh:
+        fh.write(text)
+    os.replace(tmp, path)
+
+
+def export(
+    directory: str,
+    run_id: str,
+    items: Optional[List[StageMetrics]] = None,
+    report_name: Optional[str] = None,
+    report_items: Optional[List[StageMetrics]] = None,
+) -> None:
+    """Write ``cryptoscanner.prom`` and ``metrics_<run_id>.json`` to ``directory``.
+
+    The files are replaced atomically so that a node_exporter textfile
+    collector never reads a partial file. Long-running processes pass a
+    fixed ``report_name`` so that the JSON report ``metrics_<report_name>.json``
+    is overwritten instead of adding a file per run, and ``report_items``
+    to limit it to a subset of ``items``.
+    """
+    items = records() if items is None else items
+    report_items = items if report_items is None else report_items
+    os.makedirs(directory, exist_ok=True)
+    _write_atomic(os.path.join(directory, f"{METRIC_PREFIX}.prom"), to_prometheus(items))
+    _write_atomic(
+        os.path.join(directory, f"metrics_{report_name or run_id}.json"),
+        json.dumps(to_report(run_id, report_items), indent=2),
+    )
+    LOGGER.info("Exported %d metric records to %s", len(items), directory)
@@ -9,6 +9,7 @@ import requests
 from google.cloud import bigquery
 
 from .logger import get_logger
+from . import metrics
 from .bigquery_client import (
     get_client,
     ensure_dataset,
@@ -38,9 +39,12 @@ def fetch_binance_ticker() -> List[Dict[str, Any]]:
     """
     LOGGER.info("Fetching data from Binance")
     try:
-        resp = requests.get(BINANCE_ENDPOINT, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
+        with metrics.track(BINANCE_ENDPOINT, "http") as record:
+            resp = requests.get(BINANCE_ENDPOINT, timeout=10)
+            resp.raise_for_status()
+            data = resp.json()
+            record.bytes_transferred = len(resp.content)
+            record.rows_out = len(data)
     except Exception as exc:
         LOGGER.error("Error fetching Binance data: %s", exc)
         raise
@@ -67,7 +71,10 @@ def normalize_binance_data(data: List[Dict[str, Any]]) -> pd.DataFrame:
     df["closeTime"] = pd.to_datetime(df["closeTime"], unit="ms")
     return df
 
-def ingest_binance_to_bq(project_id: str = "starlit-verve-458814-u9", dataset: str = "cryptoscanner") -> None:
+def ingest_binance_to_bq(
+    project_id: str = "starlit-verve-458814-u9",
+    dataset: str = "cryptoscanner",
+) -> None:
     """Ingest Binance ticker data into BigQuery.
 
     Parameters
@@ -80,7 +87,7 @@ def ingest_binance_to_bq(project_id: str = "starlit-verve-458814-u9", dataset: s
     client = get_client(project_id)
     ensure_dataset(client, dataset)
     table_id = f"{project_id}.{dataset}.market_raw_metrics"
-    ensure_table(client, table_id, TABLE_SCHEMA)
+    ensure_table(client, table_id, TABLE_SCHEMA, partition_field="closeTime", clustering_fields=["symbol"])
 
     raw = fetch_binance_ticker()
     df = normalize_binance_data(raw)
@@ -2,7 +2,8 @@
 
 from __future__ import annotations
 
-from typing import List
+import os
+from typing import List, Optional
 
 import pandas as pd
 from google.cloud import bigquery
@@ -10,12 +11,15 @@ from google.cloud import bigquery
 from .logger import get_logger
 from .bigquery_client import (
     get_client,
-    read_dataframe,
+    query_dataframe,
     ensure_table,
     ensure_dataset,
     write_dataframe,
     validate_dataframe,
 )
+from .module_1_4 import TIMEFRAMES, bar_table_id
+from .module_1_5 import load_active_universe, universe_table_id
+from .module_4_1 import ensure_rollup_tables, market_metrics_source, since_parameter
 
 LOGGER = get_logger(__name__)
 
@@ -25,6 +29,11 @@ TABLE_SCHEMA = [
     bigquery.SchemaField("ma20", "FLOAT"),
 ]
 
+# Samples of history read per run: enough to fill the 20-sample MA. Raw
+# snapshots are ingested once per ``RAW_SAMPLE_PERIOD``.
+DEFAULT_LOOKBACK_SAMPLES = 100
+RAW_SAMPLE_PERIOD = pd.Timedelta(minutes=1)
+
 
 def compute_moving_averages(df: pd.DataFrame) -> pd.DataFrame:
     """Compute simple moving averages as an example indicator.
@@ -45,8 +54,55 @@ def compute_moving_averages(df: pd.DataFrame) -> pd.DataFrame:
     return df[["symbol", "ma5", "ma20"]].dropna()
 
 
-def run_indicator_job(project_id: str = "starlit-verve-458814-u9", dataset: str = "cryptoscanner") -> None:
-    """Read raw metrics, compute indicators and store results.
+def read_metrics(
+    source: str,
+    client: bigquery.Client,
+    symbols: Optional[List[str]] = None,
+    bars: bool = False,
+    name: str = "market_metrics",
+    since: Optional[pd.Timestamp] = None,
+) -> pd.DataFrame:
+    """Read price history with ``symbol``, ``lastPrice`` and ``closeTime``.
+
+    Parameters
+    ----------
+    source : str
+        SQL FROM item: raw metrics unioned with their rollup (see
+        ``module_4_1.market_metrics_source``) or, with ``bars``, an OHLC bar
+        table whose bar close is returned as ``lastPrice``.
+    client : bigquery.Client
+        BigQuery client.
+    symbols : list of str, optional
+        Only return these symbols.
+    bars : bool
+        Whether ``source`` is an OHLC bar table.
+    name : str
+        Name the read is recorded under in the metrics.
+    since : pd.Timestamp, optional
+        Value of the ``@since`` parameter that ``source`` filters on.
+    """
+    columns = (
+        "symbol, close AS lastPrice, bar_start AS closeTime"
+        if bars
+        else "symbol, priceChangePercent, lastPrice, closeTime"
+    )
+    query = f"SELECT {columns} FROM {source}"
+    params = []
+    if symbols:
+        query += " WHERE symbol IN UNNEST(@symbols)"
+        params.append(bigquery.ArrayQueryParameter("symbols", "STRING", symbols))
+    if since is not None:
+        params.append(since_parameter(since))
+    return query_dataframe(query, client, params, name=name)
+
+
+def run_indicator_job(
+    project_id: str = "starlit-verve-458814-u9",
+    dataset: str = "cryptoscanner",
+    timeframe: Optional[str] = None,
+    lookback_samples: Optional[int] = None,
+) -> None:
+    """Read recent raw metrics, compute indicators and store results.
 
     Parameters
     ----------
@@ -54,7 +110,27 @@ def run_indicator_job(project_id: str = "starlit-verve-458814-u9", dataset: str
         GCP project identifier.
     dataset : str
         BigQuery dataset name.
+    timeframe : str, optional
+        Read regular OHLC bars of this timeframe (see ``module_1_4``)
+        instead of raw snapshots. Defaults to the ``INDICATOR_TIMEFRAME``
+        environment variable; raw snapshots are used if neither is set.
+    lookback_samples : int, optional
+        Samples of history to read: bars of ``timeframe``, or one-minute
+        snapshots. Defaults to the ``INDICATOR_LOOKBACK_SAMPLES``
+        environment variable, then to ``DEFAULT_LOOKBACK_SAMPLES``.
+
+    Only symbols in the active universe maintained by ``module_1_5`` are
+    processed. If no universe has been stored yet, all symbols are. Raw
+    snapshots older than the retention window are read from their hourly
+    rollup (see ``module_4_1``).
     """
+    timeframe = timeframe or os.getenv("INDICATOR_TIMEFRAME")
+    if timeframe and timeframe not in TIMEFRAMES:
+        raise ValueError(f"Unknown indicator timeframe {timeframe!r}, expected one of {sorted(TIMEFRAMES)}")
+    if lookback_samples is None:
+        lookback_samples = int(os.getenv("INDICATOR_LOOKBACK_SAMPLES", DEFAULT_LOOKBACK_SAMPLES))
+    period = pd.Timedelta(TIMEFRAMES[timeframe]) if timeframe else RAW_SAMPLE_PERIOD
+    since = pd.Timestamp.now("UTC") - lookback_samples * period
     LOGGER.info("Running indicator job")
     client = get_client(project_id)
     ensure_dataset(client, dataset)
@@ -62,7 +138,15 @@ def run_indicator_job(project_id: str = "starlit-verve-458814-u9", dataset: str
     signal_table = f"{project_id}.{dataset}.market_strategy_signals"
     ensure_table(client, signal_table, TABLE_SCHEMA)
 
-    df_raw = read_dataframe(raw_table, client)
+    symbols = load_active_universe(client, universe_table_id(project_id, dataset))
+    if timeframe:
+        bar_table = bar_table_id(project_id, dataset, timeframe)
+        source = f"(SELECT * FROM `{bar_table}` WHERE bar_start >= @since)"
+        df_raw = read_metrics(source, client, symbols, bars=True, name=bar_table, since=since)
+    else:
+        ensure_rollup_tables(client, project_id, dataset)
+        source = market_metrics_source(project_id, dataset, since="@since")
+        df_raw = read_metrics(source, client, symbols, name=raw_table, since=since)
     df_indicators = compute_moving_averages(df_raw)
     df_indicators = validate_dataframe(df_indicators, TABLE_SCHEMA)
     write_dataframe(df_indicators, signal_table, client)
@@ -70,7 +70,8 @@ def run_decision_job(project_id: str = "starlit-verve-458814-u9", dataset: str =
     ensure_table(client, output_table, TABLE_SCHEMA)
 
     LOGGER.info("Running decision job")
-    df_signals = read_dataframe(signal_table, client)
+    # Signals are only compared here, so float32 moving averages are fine.
+    df_signals = read_dataframe(signal_table, client, downcast_floats=True)
     df_decisions = generate_decisions(df_signals)
     df_decisions = validate_dataframe(df_decisions, TABLE_SCHEMA)
     write_dataframe(df_decisions, output_table, client)
@@ -0,0 +1,156 @@
+"""Materialize multi-timeframe OHLC bars from market snapshots."""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+from google.cloud import bigquery
+
+from .logger import get_logger
+from .bigquery_client import (
+    get_client,
+    ensure_dataset,
+    ensure_table,
+    merge_dataframe,
+    query_dataframe,
+    validate_dataframe,
+)
+from .module_4_1 import ensure_rollup_tables, market_metrics_source, since_parameter
+
+LOGGER = get_logger(__name__)
+
+# Timeframe name -> pandas frequency.
+TIMEFRAMES: Dict[str, str] = {
+    "5m": "5min",
+    "1h": "1h",
+    "1d": "1D",
+}
+
+TABLE_SCHEMA = [
+    bigquery.SchemaField("symbol", "STRING"),
+    bigquery.SchemaField("bar_start", "TIMESTAMP"),
+    bigquery.SchemaField("open", "FLOAT"),
+    bigquery.SchemaField("high", "FLOAT"),
+    bigquery.SchemaField("low", "FLOAT"),
+    bigquery.SchemaField("close", "FLOAT"),
+    bigquery.SchemaField("n_snapshots", "INTEGER"),
+    bigquery.SchemaField("last_update", "TIMESTAMP"),
+]
+
+# How an existing (open) bar absorbs the bar built from newer snapshots.
+MERGE_EXPRS = {
+    "open": "T.open",
+    "high": "GREATEST(T.high, S.high)",
+    "low": "LEAST(T.low, S.low)",
+    "close": "S.close",
+    "n_snapshots": "T.n_snapshots + S.n_snapshots",
+    "last_update": "GREATEST(T.last_update, S.last_update)",
+}
+
+
+def bar_table_id(project_id: str, dataset: str, timeframe: str) -> str:
+    """Return the table holding bars of ``timeframe``."""
+    return f"{project_id}.{dataset}.market_ohlc_{timeframe}"
+
+
+def build_bars(snapshots: pd.DataFrame, freq: str) -> pd.DataFrame:
+    """Aggregate price snapshots into OHLC bars.
+
+    Parameters
+    ----------
+    snapshots : pd.DataFrame
+        Raw metrics with ``symbol``, ``lastPrice`` and ``closeTime`` columns.
+    freq : str
+        Pandas frequency of the bars, e.g. ``"5min"``.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per ``symbol`` and ``bar_start`` with the columns of
+        ``TABLE_SCHEMA``.
+    """
+    df = snapshots[["symbol", "lastPrice", "closeTime"]].sort_values("closeTime", kind="stable")
+    df = df.assign(bar_start=pd.to_datetime(df["closeTime"]).dt.floor(freq))
+    bars = df.groupby(["symbol", "bar_start"], sort=False, observed=True).agg(
+        open=("lastPrice", "first"),
+        high=("lastPrice", "max"),
+        low=("lastPrice", "min"),
+        close=("lastPrice", "last"),
+        n_snapshots=("lastPrice", "size"),
+        last_update=("closeTime", "max"),
+    )
+    return bars.reset_index()
+
+
+def _watermark(client: bigquery.Client, table_id: str) -> Optional[pd.Timestamp]:
+    df = query_dataframe(f"SELECT MAX(last_update) AS wm FROM `{table_id}`", client, name=table_id)
+    value = df["wm"].iloc[0] if len(df) else None
+    if value is None or pd.isna(value):
+        return None
+    value = pd.Timestamp(value)
+    return value.tz_localize("UTC") if value.tzinfo is None else value.tz_convert("UTC")
+
+
+def run_bar_job(
+    timeframes: Iterable[str] = tuple(TIMEFRAMES),
+    project_id: str = "starlit-verve-458814-u9",
+    dataset: str = "cryptoscanner",
+) -> None:
+    """Update OHLC bar tables with snapshots ingested since the last run.
+
+    Each bar table tracks the newest snapshot it has absorbed in
+    ``last_update``. Only snapshots after the oldest of those watermarks are
+    read, new bars are inserted, and the still-open last bar of each symbol
+    is extended in place with a ``MERGE``. Snapshots that arrive with a
+    ``closeTime`` older than a table's watermark are not applied.
+
+    Snapshots are read through ``module_4_1.market_metrics_source``, so a
+    table built for the first time (or after a long pause) also covers the
+    compacted history, one snapshot per symbol and hour.
+
+    The ``closeTime`` filter only limits the bytes billed when
+    ``market_raw_metrics`` is partitioned on ``closeTime``. Ingestion
+    creates it that way; a table created before partitioning was added is
+    scanned in full on every run until it is recreated.
+
+    Parameters
+    ----------
+    timeframes : iterable of str
+        Keys of ``TIMEFRAMES`` to maintain.
+    project_id : str
+        GCP project identifier.
+    dataset : str
+        BigQuery dataset name.
+    """
+    LOGGER.info("Running OHLC bar job")
+    client = get_client(project_id)
+    ensure_dataset(client, dataset)
+    ensure_rollup_tables(client, project_id, dataset)
+    raw_table = f"{project_id}.{dataset}.market_raw_metrics"
+
+    watermarks = {}
+    for timeframe in timeframes:
+        table_id = bar_table_id(project_id, dataset, timeframe)
+        ensure_table(client, table_id, TABLE_SCHEMA, partition_field="bar_start", clustering_fields=["symbol"])
+        watermarks[timeframe] = _watermark(client, table_id)
+
+    known = [wm for wm in watermarks.values() if wm is not None]
+    params = []
+    if known and len(known) == len(watermarks):
+        source = market_metrics_source(project_id, dataset, since="@since")
+        params.append(since_parameter(min(known)))
+    else:
+        source = market_metrics_source(project_id, dataset)
+    snapshots = query_dataframe(f"SELECT symbol, lastPrice, closeTime FROM {source}", client, params, name=raw_table)
+    LOGGER.info("Read %d new snapshots from %s", len(snapshots), raw_table)
+
+    close_times = pd.to_datetime(snapshots["closeTime"], utc=True)
+    for timeframe, watermark in watermarks.items():
+        new = snapshots if watermark is None else snapshots[close_times > watermark]
+        if new.empty:
+            continue
+        bars = validate_dataframe(build_bars(new, TIMEFRAMES[timeframe]), TABLE_SCHEMA)
+        table_id = bar_table_id(project_id, dataset, timeframe)
+        merge_dataframe(bars, table_id, TABLE_SCHEMA, ["symbol", "bar_start"], client, MERGE_EXPRS)
+        LOGGER.info("Updated %d %s bars in %s", len(bars), timeframe, table_id)
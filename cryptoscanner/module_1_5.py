@@ -0,0 +1,201 @@
+"""Cross-sectional screener selecting the active symbol universe."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+from google.api_core.exceptions import NotFound
+from google.cloud import bigquery
+
+from .logger import get_logger
+from .bigquery_client import (
+    get_client,
+    ensure_dataset,
+    ensure_table,
+    query_dataframe,
+    write_dataframe,
+    validate_dataframe,
+)
+from .module_1_1 import fetch_binance_ticker
+
+LOGGER = get_logger(__name__)
+
+TABLE_SCHEMA = [
+    bigquery.SchemaField("symbol", "STRING"),
+    bigquery.SchemaField("score", "FLOAT"),
+    bigquery.SchemaField("rank", "INTEGER"),
+    bigquery.SchemaField("timestamp", "TIMESTAMP"),
+]
+
+DEFAULT_TOP_N = 100
+# A symbol already in the universe only leaves once its rank falls below
+# ``top_n * EXIT_FACTOR``, so names near the cut-off do not flap in and out.
+EXIT_FACTOR = 1.5
+
+
+def _zscore(values: np.ndarray) -> np.ndarray:
+    std = np.nanstd(values)
+    if not std > 0:
+        return np.zeros_like(values)
+    return np.nan_to_num((values - np.nanmean(values)) / std)
+
+
+def compute_screen_features(raw: pd.DataFrame) -> pd.DataFrame:
+    """Compute cross-sectional features over one ticker snapshot.
+
+    Parameters
+    ----------
+    raw : pd.DataFrame
+        Binance 24hr ticker rows with ``symbol``, ``priceChangePercent``,
+        ``quoteVolume``, ``bidPrice`` and ``askPrice``.
+
+    Returns
+    -------
+    pd.DataFrame
+        Per symbol: percentile ranks of price change and quote volume,
+        relative spread, momentum/volume/spread z-scores and a combined
+        ``score`` (liquid, tight and moving symbols score highest).
+    """
+    change = pd.to_numeric(raw["priceChangePercent"], errors="coerce").to_numpy(dtype=float)
+    volume = pd.to_numeric(raw["quoteVolume"], errors="coerce").to_numpy(dtype=float)
+    bid = pd.to_numeric(raw["bidPrice"], errors="coerce").to_numpy(dtype=float)
+    ask = pd.to_numeric(raw["askPrice"], errors="coerce").to_numpy(dtype=float)
+
+    mid = (bid + ask) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        spread = np.where((bid > 0) & (ask >= bid), (ask - bid) / mid, np.nan)
+    log_volume = np.log1p(np.clip(volume, 0, None))
+
+    features = pd.DataFrame({
+        "symbol": raw["symbol"].to_numpy(),
+        "change_pct_rank": pd.Series(change).rank(pct=True).to_numpy(),
+        "volume_pct_rank": pd.Series(volume).rank(pct=True).to_numpy(),
+        "spread": spread,
+        "momentum_z": _zscore(change),
+        "volume_z": _zscore(log_volume),
+        "spread_z": _zscore(np.log(np.where(spread > 0, spread, np.nan))),
+    })
+    features["score"] = features["volume_z"] + np.abs(features["momentum_z"]) - features["spread_z"]
+    # Symbols without a usable quote cannot be traded.
+    features.loc[~np.isfinite(spread) | ~(volume > 0), "score"] = -np.inf
+    return features
+
+
+def select_universe(
+    features: pd.DataFrame,
+    previous: Optional[Set[str]] = None,
+    top_n: int = DEFAULT_TOP_N,
+    exit_factor: float = EXIT_FACTOR,
+) -> pd.DataFrame:
+    """Select the active universe with hysteresis.
+
+    New symbols enter when they rank in the top ``top_n``; symbols from
+    ``previous`` stay while they rank in the top ``top_n * exit_factor``.
+
+    Returns
+    -------
+    pd.DataFrame
+        ``symbol``, ``score`` and ``rank`` of the selected symbols.
+    """
+    previous = previous or set()
+    ranked = features[["symbol", "score"]].copy()
+    ranked["rank"] = ranked["score"].rank(ascending=False, method="first").astype("int64")
+    tradable = np.isfinite(ranked["score"])
+    enter = ranked["rank"] <= top_n
+    stay = ranked["symbol"].isin(previous) & (ranked["rank"] <= int(top_n * exit_factor))
+    selected = ranked[tradable & (enter | stay)]
+    return selected.sort_values("rank", ignore_index=True)
+
+
+def universe_table_id(project_id: str, dataset: str) -> str:
+    """Return the table holding the active universe."""
+    return f"{project_id}.{dataset}.market_active_universe"
+
+
+def load_active_universe(client: bigquery.Client, table_id: str) -> List[str]:
+    """Return the symbols of the current universe, or an empty list if unset.
+
+    Only a missing table counts as unset; other errors (e.g. permissions)
+    propagate so that the universe filter is never disabled silently.
+    """
+    try:
+        df = query_dataframe(f"SELECT symbol FROM `{table_id}`", client, name=table_id, compact=False)
+    except NotFound:
+        LOGGER.warning("Active universe %s does not exist yet", table_id)
+        return []
+    return df["symbol"].astype(str).tolist()
+
+
+def update_active_universe(
+    raw: List[Dict[str, Any]],
+    client: bigquery.Client,
+    project_id: str = "starlit-verve-458814-u9",
+    dataset: str = "cryptoscanner",
+    top_n: int = DEFAULT_TOP_N,
+) -> List[str]:
+    """Screen a raw ticker snapshot and replace the stored universe.
+
+    Parameters
+    ----------
+    raw : list of dict
+        Raw ticker rows from Binance.
+    client : bigquery.Client
+        BigQuery client.
+    project_id : str
+        GCP project identifier.
+    dataset : str
+        BigQuery dataset name.
+    top_n : int
+        Target universe size.
+
+    Returns
+    -------
+    list of str
+        Symbols in the new universe.
+    """
+    table_id = universe_table_id(project_id, dataset)
+    ensure_table(client, table_id, TABLE_SCHEMA)
+    previous = set(load_active_universe(client, table_id))
+    features = compute_screen_features(pd.DataFrame(raw))
+    universe = select_universe(features, previous, top_n)
+    universe["timestamp"] = pd.Timestamp.now("UTC")
+    universe = validate_dataframe(universe, TABLE_SCHEMA)
+    write_dataframe(universe, table_id, client, if_exists="replace")
+    symbols = universe["symbol"].tolist()
+    LOGGER.info(
+        "Active universe: %d symbols (%d entered, %d left)",
+        len(symbols), len(set(symbols) - previous), len(previous - set(symbols)),
+    )
+    return symbols
+
+
+def run_screener_job(
+    project_id: str = "starlit-verve-458814-u9",
+    dataset: str = "cryptoscanner",
+    top_n: int = DEFAULT_TOP_N,
+) -> List[str]:
+    """Screen a fresh Binance ticker snapshot and store the active universe.
+
+    The stored raw metrics lack the quote volume and bid/ask prices the
+    screener needs, so the full 24hr ticker is fetched again.
+
+    Parameters
+    ----------
+    project_id : str
+        GCP project identifier.
+    dataset : str
+        BigQuery dataset name.
+    top_n : int
+        Target universe size.
+
+    Returns
+    -------
+    list of str
+        Symbols in the new universe.
+    """
+    LOGGER.info("Running screener job")
+    client = get_client(project_id)
+    ensure_dataset(client, dataset)
+    return update_active_universe(fetch_binance_ticker(), client, project_id, dataset, top_n)
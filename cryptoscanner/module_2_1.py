@@ -10,6 +10,7 @@ import requests
 from google.cloud import bigquery
 
 from .logger import get_logger
+from . import metrics
 from .bigquery_client import (
     get_client,
     ensure_dataset,
@@ -50,9 +51,12 @@ def fetch_dune_data(query_id: str, api_key: str) -> List[Dict[str, Any]]:
     LOGGER.info("Fetching data from Dune query %s", query_id)
     headers = {API_KEY_HEADER: api_key}
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        resp.raise_for_status()
-        data = resp.json().get("result", {}).get("rows", [])
+        with metrics.track(url, "http") as record:
+            resp = requests.get(url, headers=headers, timeout=10)
+            resp.raise_for_status()
+            data = resp.json().get("result", {}).get("rows", [])
+            record.bytes_transferred = len(resp.content)
+            record.rows_out = len(data)
     except Exception as exc:
         LOGGER.error("Error fetching Dune data: %s", exc)
         raise
@@ -2,7 +2,7 @@ import logging
 from google.cloud import bigquery
 import pandas as pd
 
-from cryptoscanner.bigquery_client import write_dataframe
+from cryptoscanner.bigquery_client import get_client, query_dataframe, write_dataframe
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +35,12 @@ def convert_decimal_to_float(df):
 def ensure_str_columns(df, columns):
     """Ensure columns like address/hash are string type for BigQuery and pandas compatibility."""
     for col in columns:
-        if col in df.columns:
+        if col not in df.columns:
+            continue
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            # Convert the distinct values only and keep the compact encoding.
+            df[col] = df[col].cat.rename_categories(df[col].cat.categories.astype(str))
+        else:
             df[col] = df[col].astype(str)
     return df
 
@@ -46,10 +51,10 @@ def ingest_onchain_bigquery_to_bq():
     are converted to hexadecimal strings for BigQuery compatibility.
     """
     logger.info("Fetching on-chain data from BigQuery public dataset")
-    client = bigquery.Client()
+    client = get_client()
 
-    query_job = client.query(QUERY)
-    df = query_job.to_dataframe()
+    # With compact dtypes NUMERIC becomes float64 and BYTES addresses categorical hex.
+    df = query_dataframe(QUERY, client, name="bigquery-public-data.crypto_ethereum.transactions")
     # Convert decimal.Decimal columns to float before any computation or writing
     df = convert_decimal_to_float(df)
     # Convert bytes columns (e.g. addresses) to hex string for BigQuery compatibility
@@ -2,11 +2,14 @@
 
 from __future__ import annotations
 
+from typing import Optional
+
 import pandas as pd
 from google.cloud import bigquery
 
 from .logger import get_logger
-from .bigquery_client import get_client, read_dataframe, ensure_dataset
+from .bigquery_client import get_client, query_dataframe, ensure_dataset
+from .module_4_1 import ensure_rollup_tables, onchain_lookback_start, onchain_metrics_source, since_parameter
 
 LOGGER = get_logger(__name__)
 
@@ -28,15 +31,25 @@ def compute_daily_aggregate(df: pd.DataFrame) -> pd.DataFrame:
     return df.groupby("date").agg({"eth_transferred": "sum"}).reset_index()
 
 
-def run_onchain_indicator_job(project_id: str = "starlit-verve-458814-u9", dataset: str = "cryptoscanner") -> pd.DataFrame:
+def run_onchain_indicator_job(
+    project_id: str = "starlit-verve-458814-u9",
+    dataset: str = "cryptoscanner",
+    lookback_days: Optional[int] = None,
+) -> pd.DataFrame:
     """Read raw on-chain metrics and compute daily aggregates.
 
+    Days older than the retention window come from the daily rollup (see
+    ``module_4_1``).
+
     Parameters
     ----------
     project_id : str
         GCP project identifier.
     dataset : str
         BigQuery dataset name.
+    lookback_days : int, optional
+        Days of history to aggregate. Defaults to ``ONCHAIN_LOOKBACK_DAYS``
+        (see ``module_4_1.onchain_lookback_start``).
 
     Returns
     -------
@@ -48,7 +61,14 @@ def run_onchain_indicator_job(project_id: str = "starlit-verve-458814-u9", datas
     ensure_dataset(client, dataset)
     raw_table = f"{project_id}.{dataset}.onchain_raw_metrics"
 
-    df_raw = read_dataframe(raw_table, client)
+    ensure_rollup_tables(client, project_id, dataset)
+    df_raw = query_dataframe(
+        f"SELECT * FROM {onchain_metrics_source(project_id, dataset, since='@since')}",
+        client,
+        [since_parameter(onchain_lookback_start(lookback_days))],
+        name=raw_table,
+        downcast_floats=True,
+    )
     # S'assurer que les colonnes nécessaires sont présentes
     required_cols = ["timestamp", "address", "eth_transferred", "gas_price_gwei", "source"]
     missing_cols = [col for col in required_cols if col not in df_raw.columns]
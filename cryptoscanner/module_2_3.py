@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from typing import Optional
 
 import pandas as pd
 from google.cloud import bigquery
@@ -13,9 +14,9 @@ from .bigquery_client import (
     ensure_table,
     write_dataframe,
     validate_dataframe,
-    read_dataframe,
+    query_dataframe,
 )
-from .module_2_2 import run_onchain_indicator_job
+from .module_4_1 import ensure_rollup_tables, onchain_lookback_start, onchain_metrics_source, since_parameter
 
 LOGGER = get_logger(__name__)
 
@@ -39,6 +40,27 @@ def detect_anomalies(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def compute_daily_onchain(df: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate on-chain rows per day: total ETH and mean gas price.
+
+    Rows may be rollups standing for several transactions; the gas price
+    mean is weighted by their optional ``tx_count`` column.
+    """
+    weights = df["tx_count"] if "tx_count" in df.columns else 1
+    df = df.assign(
+        date=pd.to_datetime(df["timestamp"]).dt.date,
+        gas_weighted=df["gas_price_gwei"] * weights,
+        tx_count=weights,
+    )
+    df_daily = df.groupby("date").agg({
+        "eth_transferred": "sum",
+        "gas_weighted": "sum",
+        "tx_count": "sum",
+    }).reset_index()
+    df_daily["gas_price_gwei"] = df_daily["gas_weighted"] / df_daily["tx_count"]
+    return df_daily[["date", "eth_transferred", "gas_price_gwei"]]
+
+
 def convert_decimal_to_float(df):
     """Convert all decimal.Decimal columns in a DataFrame to float for BigQuery/serialization compatibility."""
     import decimal
@@ -51,22 +73,42 @@ def convert_decimal_to_float(df):
 def ensure_str_columns(df, columns):
     """Ensure columns like address/hash are string type for BigQuery and pandas compatibility."""
     for col in columns:
-        if col in df.columns:
+        if col not in df.columns:
+            continue
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            # Convert the distinct values only and keep the compact encoding.
+            df[col] = df[col].cat.rename_categories(df[col].cat.categories.astype(str))
+        else:
             df[col] = df[col].astype(str)
     return df
 
 
-def run_anomaly_job(project_id: str = "starlit-verve-458814-u9", dataset: str = "cryptoscanner") -> None:
-    """Detect anomalies from on-chain data and store alerts in BigQuery."""
+def run_anomaly_job(
+    project_id: str = "starlit-verve-458814-u9",
+    dataset: str = "cryptoscanner",
+    lookback_days: Optional[int] = None,
+) -> None:
+    """Detect anomalies from on-chain data and store alerts in BigQuery.
+
+    Only the last ``lookback_days`` days (default ``ONCHAIN_LOOKBACK_DAYS``,
+    see ``module_4_1.onchain_lookback_start``) are read, and the thresholds
+    are computed over that window.
+    """
     LOGGER.info("Running anomaly detection job")
     client = get_client(project_id)
     ensure_dataset(client, dataset)
     table_id = f"{project_id}.{dataset}.anomaly_alerts_onchain"
     ensure_table(client, table_id, TABLE_SCHEMA)
 
-    # Lire la table onchain_raw_metrics
+    # Lire la table onchain_raw_metrics (et son rollup journalier)
     raw_table = f"{project_id}.{dataset}.onchain_raw_metrics"
-    df_raw = read_dataframe(raw_table, client)
+    ensure_rollup_tables(client, project_id, dataset)
+    df_raw = query_dataframe(
+        f"SELECT * FROM {onchain_metrics_source(project_id, dataset, since='@since')}",
+        client,
+        [since_parameter(onchain_lookback_start(lookback_days))],
+        name=raw_table,
+    )
     # Convert decimal.Decimal columns to float before any computation or writing
     df_raw = convert_decimal_to_float(df_raw)
     # Ensure address columns are string type
@@ -77,11 +119,7 @@ def run_anomaly_job(project_id: str = "starlit-verve-458814-u9", dataset: str =
     if missing_cols:
         raise ValueError(f"Missing columns in onchain_raw_metrics: {missing_cols}")
     # Agréger par jour
-    df_raw["date"] = pd.to_datetime(df_raw["timestamp"]).dt.date
-    df_daily = df_raw.groupby("date").agg({
-        "eth_transferred": "sum",
-        "gas_price_gwei": "mean"
-    }).reset_index()
+    df_daily = compute_daily_onchain(df_raw)
     df_alerts = detect_anomalies(df_daily)
     df_alerts = validate_dataframe(df_alerts, TABLE_SCHEMA)
     write_dataframe(df_alerts, table_id, client)
@@ -2,25 +2,65 @@
 
 import os
 import logging
-from typing import Iterable
+from typing import Iterator
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
 from google.cloud import bigquery
-from telegram import Bot
 
 from .logger import get_logger
-from .bigquery_client import get_client, read_dataframe
+from .bigquery_client import get_client, iter_record_batches, read_dataframe
 
 LOGGER = get_logger(__name__)
 
-def fetch_messages(table_id: str, client: bigquery.Client) -> Iterable[str]:
+def _column_text(column: pa.Array) -> pa.Array:
+    try:
+        text = pc.cast(column, pa.string())
+    except pa.ArrowNotImplementedError:
+        # Nested types have no string cast.
+        text = pa.array([None if v is None else str(v) for v in column.to_pylist()], pa.string())
+    return pc.fill_null(text, "None")
+
+
+def format_messages(batch: pa.RecordBatch) -> pa.Array:
+    """Format every row of ``batch`` as ``"col=value, col=value"``.
+
+    Values are rendered with Arrow's string cast (missing values as
+    ``None``) and joined column-wise, without a Python object per row.
+    """
+    if batch.num_rows == 0 or batch.num_columns == 0:
+        return pa.array([""] * batch.num_rows, pa.string())
+    fields = [
+        pc.binary_join_element_wise(f"{name}=", _column_text(column), "")
+        for name, column in zip(batch.schema.names, batch.columns)
+    ]
+    return pc.binary_join_element_wise(*fields, ", ")
+
+
+def fetch_messages(
+    table_id: str,
+    client: bigquery.Client,
+    since: pd.Timestamp | None = None,
+    limit: int | None = None,
+    since_column: str = "timestamp",
+) -> Iterator[str]:
+    """Stream one formatted message per row of ``table_id``.
+
+    Rows are pulled as Arrow record batches, one page at a time, and each
+    batch is formatted with :func:`format_messages`, so memory stays bounded
+    by the page size.
+    """
     LOGGER.info(f"Fetching messages from table {table_id}")
+    n_rows = 0
     try:
-        df = read_dataframe(table_id, client)
-        LOGGER.info(f"Fetched {len(df)} rows from {table_id}")
-        for _, row in df.iterrows():
-            yield str(row.to_dict())
+        for batch in iter_record_batches(
+            table_id, client, since=since, since_column=since_column, limit=limit
+        ):
+            yield from format_messages(batch).to_pylist()
+            n_rows += batch.num_rows
+        LOGGER.info(f"Fetched {n_rows} rows from {table_id}")
     except Exception as e:
         LOGGER.error(f"Error reading {table_id}: {e}")
         raise
@@ -44,6 +84,8 @@ def send_telegram_message(api_token: str, chat_id: str, text: str) -> None:
     safe_chat = str(chat_id)[:8] + "..." if isinstance(chat_id, str) else chat_id
     LOGGER.info(f"[TELEGRAM v13] Will send to token={safe_token}, chat_id={safe_chat}")
     try:
+        from telegram import Bot
+
         bot = Bot(token=api_token)
         bot.send_message(chat_id=chat_id, text=text, parse_mode="Markdown")
         LOGGER.info("Telegram message sent successfully.")
@@ -0,0 +1,212 @@
+"""Retention and rollup compaction of the raw metric tables.
+
+Raw rows older than the retention horizon are aggregated into rollup
+tables (hourly for market snapshots, daily for on-chain transactions) and
+then deleted from the raw tables, in one transaction. Readers use
+:func:`market_metrics_source` and :func:`onchain_metrics_source`, which
+union the recent raw rows with the rollups. Compaction keeps the raw
+tables small; readers that do not need the whole history pass a ``since``
+bound, which is applied to both tables. The rollups are partitioned by day
+on their time column, so that bound prunes them.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+import pandas as pd
+from google.cloud import bigquery
+
+from .logger import get_logger
+from .bigquery_client import (
+    get_client,
+    ensure_dataset,
+    ensure_table,
+    run_query,
+)
+
+LOGGER = get_logger(__name__)
+
+DEFAULT_RETENTION_DAYS = 7
+# Days of on-chain history read by the on-chain indicator and anomaly jobs.
+DEFAULT_ONCHAIN_LOOKBACK_DAYS = 90
+
+MARKET_ROLLUP_SCHEMA = [
+    bigquery.SchemaField("symbol", "STRING"),
+    bigquery.SchemaField("priceChangePercent", "FLOAT"),
+    bigquery.SchemaField("lastPrice", "FLOAT"),
+    bigquery.SchemaField("closeTime", "TIMESTAMP"),
+    bigquery.SchemaField("open", "FLOAT"),
+    bigquery.SchemaField("high", "FLOAT"),
+    bigquery.SchemaField("low", "FLOAT"),
+    bigquery.SchemaField("n_snapshots", "INTEGER"),
+]
+
+ONCHAIN_ROLLUP_SCHEMA = [
+    bigquery.SchemaField("timestamp", "TIMESTAMP"),
+    bigquery.SchemaField("source", "STRING"),
+    bigquery.SchemaField("eth_transferred", "FLOAT"),
+    bigquery.SchemaField("gas_price_gwei", "FLOAT"),
+    bigquery.SchemaField("tx_count", "INTEGER"),
+]
+
+
+def _tables(project_id: str, dataset: str) -> dict:
+    prefix = f"{project_id}.{dataset}"
+    return {
+        "market_raw": f"{prefix}.market_raw_metrics",
+        "market_rollup": f"{prefix}.market_rollup_hourly",
+        "onchain_raw": f"{prefix}.onchain_raw_metrics",
+        "onchain_rollup": f"{prefix}.onchain_rollup_daily",
+    }
+
+
+def ensure_rollup_tables(client: bigquery.Client, project_id: str, dataset: str) -> None:
+    """Create the rollup tables, partitioned by day, if they do not exist."""
+    tables = _tables(project_id, dataset)
+    ensure_table(
+        client, tables["market_rollup"], MARKET_ROLLUP_SCHEMA,
+        partition_field="closeTime", clustering_fields=["symbol"],
+    )
+    ensure_table(
+        client, tables["onchain_rollup"], ONCHAIN_ROLLUP_SCHEMA,
+        partition_field="timestamp", clustering_fields=["source"],
+    )
+
+
+def since_parameter(since: pd.Timestamp) -> bigquery.ScalarQueryParameter:
+    """Return the ``@since`` query parameter expected by the sources below."""
+    return bigquery.ScalarQueryParameter("since", "TIMESTAMP", pd.Timestamp(since).to_pydatetime())
+
+
+def market_metrics_source(project_id: str, dataset: str, since: Optional[str] = None) -> str:
+    """Return a FROM item with ``symbol, priceChangePercent, lastPrice, closeTime``.
+
+    Compacted hours contribute one row per symbol carrying the last
+    snapshot of the hour.
+
+    Parameters
+    ----------
+    project_id : str
+        GCP project identifier.
+    dataset : str
+        BigQuery dataset name.
+    since : str, optional
+        SQL timestamp expression, typically ``"@since"`` (see
+        :func:`since_parameter`). Only rows with ``closeTime >= since`` are
+        read from either table.
+    """
+    tables = _tables(project_id, dataset)
+    columns = "symbol, priceChangePercent, lastPrice, closeTime"
+    where = f" WHERE closeTime >= {since}" if since else ""
+    return (
+        f"(SELECT {columns} FROM `{tables['market_raw']}`{where} "
+        f"UNION ALL SELECT {columns} FROM `{tables['market_rollup']}`{where})"
+    )
+
+
+def onchain_metrics_source(project_id: str, dataset: str, since: Optional[str] = None) -> str:
+    """Return a FROM item shaped like ``onchain_raw_metrics`` plus ``tx_count``.
+
+    Raw rows have ``tx_count = 1``. Compacted days contribute one row per
+    source with the summed ``eth_transferred``, the mean ``gas_price_gwei``
+    and a NULL ``address``; weight gas prices by ``tx_count`` when
+    averaging. ``since`` bounds ``timestamp`` like in
+    :func:`market_metrics_source`.
+    """
+    tables = _tables(project_id, dataset)
+    where = f" WHERE timestamp >= {since}" if since else ""
+    return (
+        f"(SELECT timestamp, address, eth_transferred, gas_price_gwei, source, 1 AS tx_count "
+        f"FROM `{tables['onchain_raw']}`{where} "
+        f"UNION ALL SELECT timestamp, CAST(NULL AS STRING) AS address, eth_transferred, "
+        f"gas_price_gwei, source, tx_count FROM `{tables['onchain_rollup']}`{where})"
+    )
+
+
+def onchain_lookback_start(lookback_days: Optional[int] = None) -> pd.Timestamp:
+    """Return the start of the on-chain history window, at midnight UTC.
+
+    ``lookback_days`` defaults to the ``ONCHAIN_LOOKBACK_DAYS`` environment
+    variable, then to ``DEFAULT_ONCHAIN_LOOKBACK_DAYS``. The window starts
+    at a day boundary so that the first day is complete.
+    """
+    if lookback_days is None:
+        lookback_days = int(os.getenv("ONCHAIN_LOOKBACK_DAYS", DEFAULT_ONCHAIN_LOOKBACK_DAYS))
+    return (pd.Timestamp.now("UTC") - pd.Timedelta(days=lookback_days)).floor("D")
+
+
+def build_compaction_script(project_id: str, dataset: str) -> str:
+    """Return the multi-statement script that rolls up and deletes old rows.
+
+    The cutoffs are truncated to whole hours/days so that a bucket is never
+    split across two compactions. The script expects a ``@retention_days``
+    INT64 parameter.
+    """
+    t = _tables(project_id, dataset)
+    horizon = "TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL @retention_days DAY)"
+    return f"""
+DECLARE market_cutoff TIMESTAMP DEFAULT TIMESTAMP_TRUNC({horizon}, HOUR);
+DECLARE onchain_cutoff TIMESTAMP DEFAULT TIMESTAMP_TRUNC({horizon}, DAY);
+BEGIN TRANSACTION;
+INSERT INTO `{t['market_rollup']}`
+    (symbol, priceChangePercent, lastPrice, closeTime, open, high, low, n_snapshots)
+SELECT
+    symbol,
+    ARRAY_AGG(priceChangePercent ORDER BY closeTime DESC LIMIT 1)[OFFSET(0)],
+    ARRAY_AGG(lastPrice ORDER BY closeTime DESC LIMIT 1)[OFFSET(0)],
+    MAX(closeTime),
+    ARRAY_AGG(lastPrice ORDER BY closeTime LIMIT 1)[OFFSET(0)],
+    MAX(lastPrice),
+    MIN(lastPrice),
+    COUNT(*)
+FROM `{t['market_raw']}`
+WHERE closeTime < market_cutoff
+GROUP BY symbol, TIMESTAMP_TRUNC(closeTime, HOUR);
+DELETE FROM `{t['market_raw']}` WHERE closeTime < market_cutoff;
+INSERT INTO `{t['onchain_rollup']}`
+    (timestamp, source, eth_transferred, gas_price_gwei, tx_count)
+SELECT
+    TIMESTAMP_TRUNC(timestamp, DAY),
+    source,
+    SUM(eth_transferred),
+    AVG(gas_price_gwei),
+    COUNT(*)
+FROM `{t['onchain_raw']}`
+WHERE timestamp < onchain_cutoff
+GROUP BY 1, 2;
+DELETE FROM `{t['onchain_raw']}` WHERE timestamp < onchain_cutoff;
+COMMIT TRANSACTION;
+"""
+
+
+def run_compaction_job(
+    retention_days: int | None = None,
+    project_id: str = "starlit-verve-458814-u9",
+    dataset: str = "cryptoscanner",
+) -> None:
+    """Roll raw rows older than the retention horizon into rollups and delete them.
+
+    Parameters
+    ----------
+    retention_days : int, optional
+        Days of raw rows to keep, at least 1. Defaults to the
+        ``RAW_RETENTION_DAYS`` environment variable, then to
+        ``DEFAULT_RETENTION_DAYS``.
+    project_id : str
+        GCP project identifier.
+    dataset : str
+        BigQuery dataset name.
+    """
+    if retention_days is None:
+        retention_days = int(os.getenv("RAW_RETENTION_DAYS", DEFAULT_RETENTION_DAYS))
+    if retention_days < 1:
+        raise ValueError(f"retention_days must be at least 1, got {retention_days}")
+    LOGGER.info("Running compaction job (retention %d days)", retention_days)
+    client = get_client(project_id)
+    ensure_dataset(client, dataset)
+    ensure_rollup_tables(client, project_id, dataset)
+    params = [bigquery.ScalarQueryParameter("retention_days", "INT64", retention_days)]
+    run_query(build_compaction_script(project_id, dataset), client, params, name="compaction")
+    LOGGER.info("Compacted raw metrics older than %d days", retention_days)
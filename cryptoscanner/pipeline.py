@@ -0,0 +1,178 @@
+"""Pipeline stage registry and command line entry point.
+
+Stages are registered by module path and resolved only when they run, so
+``python -m cryptoscanner indicators`` imports nothing but the indicator
+job and its dependencies.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from . import metrics
+from .logger import get_logger
+from .profiling import ProfileConfig, config_from_env, profile_stage
+
+LOGGER = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class Stage:
+    """A named pipeline step backed by a job function.
+
+    Stages with ``default=False`` only run in a batch run when they are
+    named explicitly; the daemon schedules every stage.
+    """
+
+    name: str
+    module: str
+    function: str
+    critical: bool = True
+    depends_on: tuple = ()
+    default: bool = True
+
+    def load(self) -> Callable[..., Any]:
+        """Import the stage module and return its job function."""
+        return getattr(importlib.import_module(self.module, __package__), self.function)
+
+
+STAGES: Dict[str, Stage] = {
+    stage.name: stage
+    for stage in (
+        Stage("ingest", ".module_1_1", "ingest_binance_to_bq"),
+        Stage("screen", ".module_1_5", "run_screener_job", critical=False),
+        Stage("bars", ".module_1_4", "run_bar_job", critical=False, depends_on=("ingest",)),
+        Stage("indicators", ".module_1_2", "run_indicator_job", depends_on=("ingest",)),
+        Stage("decisions", ".module_1_3", "run_decision_job", depends_on=("indicators",)),
+        # Remplace le module Dune 2.1
+        Stage("onchain_ingest", ".module_2_1_1", "ingest_onchain_bigquery_to_bq", critical=False),
+        Stage("anomalies", ".module_2_3", "run_anomaly_job", critical=False, depends_on=("onchain_ingest",)),
+        Stage("alerting", ".module_3_1", "alert_from_bigquery", depends_on=("decisions",)),
+        Stage("compaction", ".module_4_1", "run_compaction_job", critical=False, default=False),
+    )
+}
+
+PROFILE_CONFIG = config_from_env()
+
+
+def run_stage(name: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run one pipeline stage under metrics collection and optional profiling."""
+    with metrics.track(name), profile_stage(name, PROFILE_CONFIG):
+        return func(*args, **kwargs)
+
+
+def run_stages(names: Optional[Sequence[str]] = None) -> List[str]:
+    """Run the named stages in pipeline order.
+
+    Non-critical stages log their failure instead of aborting the run, and
+    stages whose dependencies failed in this run are skipped.
+
+    Parameters
+    ----------
+    names : sequence of str, optional
+        Stages to run. All default stages run if omitted.
+
+    Returns
+    -------
+    list of str
+        Names of the stages that failed or were skipped.
+    """
+    selected = set(names or [name for name, stage in STAGES.items() if stage.default])
+    unknown = selected - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages: {sorted(unknown)}")
+    failed: List[str] = []
+    for stage in STAGES.values():
+        if stage.name not in selected:
+            continue
+        if any(dep in failed for dep in stage.depends_on):
+            LOGGER.warning("Skipping stage %s: dependency failed", stage.name)
+            failed.append(stage.name)
+            continue
+        try:
+            run_stage(stage.name, stage.load())
+        except Exception as exc:
+            if stage.critical:
+                raise
+            LOGGER.error("Stage %s failed: %s", stage.name, exc)
+            failed.append(stage.name)
+    return failed
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the CryptoScanner pipeline.")
+    parser.add_argument(
+        "stages",
+        nargs="*",
+        metavar="STAGE",
+        help=(
+            "stages to run, in pipeline order (default: "
+            f"{', '.join(name for name, stage in STAGES.items() if stage.default)})"
+        ),
+    )
+    parser.add_argument("--profile", action="store_true", help="profile each stage with cProfile and tracemalloc")
+    parser.add_argument("--profile-dir", help="directory for .pstats and allocation reports")
+    parser.add_argument("--profile-sample-rate", type=float, help="fraction of stage runs to profile")
+    parser.add_argument("--daemon", action="store_true", help="stay resident and run each stage on its own interval")
+    parser.add_argument(
+        "--interval",
+        action="append",
+        default=[],
+        metavar="STAGE=SECONDS",
+        help="override a stage interval in daemon mode (repeatable)",
+    )
+    parser.add_argument(
+        "--overlap",
+        choices=("skip", "queue"),
+        default="skip",
+        help="in daemon mode, skip or queue a stage that is due while still running",
+    )
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.stages if name not in STAGES]
+    intervals = {}
+    for item in args.interval:
+        name, _, seconds = item.partition("=")
+        if name not in STAGES:
+            unknown.append(name)
+            continue
+        try:
+            intervals[name] = float(seconds)
+        except ValueError:
+            parser.error(f"invalid interval: {item}")
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+    args.intervals = intervals
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    global PROFILE_CONFIG
+    args = parse_args(argv)
+    PROFILE_CONFIG = ProfileConfig(
+        enabled=args.profile or PROFILE_CONFIG.enabled,
+        directory=args.profile_dir or PROFILE_CONFIG.directory,
+        sample_rate=PROFILE_CONFIG.sample_rate if args.profile_sample_rate is None else args.profile_sample_rate,
+        top_n=PROFILE_CONFIG.top_n,
+        # Concurrent daemon stages would share tracemalloc's process-wide trace.
+        memory=PROFILE_CONFIG.memory and not args.daemon,
+    )
+    if args.daemon:
+        from .daemon import run_daemon
+
+        run_daemon(args.stages, args.intervals, args.overlap, os.getenv("METRICS_DIR"))
+        return
+    LOGGER.info("Starting CryptoScanner pipeline")
+    run_id = time.strftime("%Y%m%dT%H%M%S")
+    metrics.reset()
+    try:
+        run_stages(args.stages)
+    finally:
+        metrics_dir = os.getenv("METRICS_DIR")
+        if metrics_dir:
+            metrics.export(metrics_dir, run_id)
+    LOGGER.info("Pipeline finished")
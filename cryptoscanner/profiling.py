@@ -0,0 +1,128 @@
+"""Opt-in cProfile and tracemalloc capture around pipeline stages.
+
+Profiling is off by default. It is enabled with ``CRYPTOSCANNER_PROFILE=1``
+or the ``--profile`` flag of ``run_pipeline.py``. Each profiled stage run
+writes ``<stage>_<timestamp>.pstats`` and ``<stage>_<timestamp>.alloc.txt``
+to the profile directory. With a sample rate below 1 only that fraction of
+stage runs is profiled, which keeps the overhead low enough to leave it on
+in production.
+
+Only one stage is profiled at a time: cProfile follows the thread that
+started it and tracemalloc traces the whole process. When stages run
+concurrently (daemon mode), allocation reports would mix every running
+stage, so the daemon turns ``memory`` capture off and only writes
+``.pstats`` files.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import os
+import random
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from .logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+PROFILE_ENV = "CRYPTOSCANNER_PROFILE"
+PROFILE_DIR_ENV = "CRYPTOSCANNER_PROFILE_DIR"
+SAMPLE_RATE_ENV = "CRYPTOSCANNER_PROFILE_SAMPLE_RATE"
+TOP_N_ENV = "CRYPTOSCANNER_PROFILE_TOP_N"
+
+_ACTIVE = False
+_ACTIVE_LOCK = threading.Lock()
+
+
+@dataclass
+class ProfileConfig:
+    """Settings controlling stage profiling."""
+
+    enabled: bool = False
+    directory: str = "profiles"
+    sample_rate: float = 1.0
+    top_n: int = 25
+    memory: bool = True
+
+
+def config_from_env() -> ProfileConfig:
+    """Build a :class:`ProfileConfig` from ``CRYPTOSCANNER_PROFILE*`` variables."""
+    return ProfileConfig(
+        enabled=os.getenv(PROFILE_ENV, "").lower() in ("1", "true", "yes"),
+        directory=os.getenv(PROFILE_DIR_ENV, "profiles"),
+        sample_rate=float(os.getenv(SAMPLE_RATE_ENV, "1.0")),
+        top_n=int(os.getenv(TOP_N_ENV, "25")),
+    )
+
+
+def _write_allocations(snapshot: tracemalloc.Snapshot, path: str, peak: int, top_n: int) -> None:
+    stats = snapshot.statistics("lineno")
+    with open(path, "w") as fh:
+        fh.write(f"peak traced memory: {peak / 1e6:.1f} MB\n")
+        fh.write(f"top {top_n} allocation sites still alive at stage end:\n")
+        for stat in stats[:top_n]:
+            fh.write(f"{stat}\n")
+
+
+@contextmanager
+def profile_stage(name: str, config: Optional[ProfileConfig] = None) -> Iterator[bool]:
+    """Profile the enclosed block with cProfile and, if enabled, tracemalloc.
+
+    Parameters
+    ----------
+    name : str
+        Stage name, used as the output file prefix.
+    config : ProfileConfig, optional
+        Profiling settings. Read from the environment if omitted.
+
+    Yields
+    ------
+    bool
+        Whether this run of the stage is being profiled.
+    """
+    global _ACTIVE
+    config = config or config_from_env()
+    if not config.enabled or random.random() >= config.sample_rate:
+        yield False
+        return
+    # Only one cProfile profiler can be active at a time, so nested or
+    # concurrent stages are covered by the one that started first.
+    with _ACTIVE_LOCK:
+        if _ACTIVE:
+            acquired = False
+        else:
+            _ACTIVE = acquired = True
+    if not acquired:
+        yield False
+        return
+
+    try:
+        os.makedirs(config.directory, exist_ok=True)
+        prefix = os.path.join(config.directory, f"{name}_{time.strftime('%Y%m%dT%H%M%S')}")
+        started_tracing = config.memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if config.memory:
+            tracemalloc.reset_peak()
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield True
+        finally:
+            profiler.disable()
+            if config.memory:
+                snapshot = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                if started_tracing:
+                    tracemalloc.stop()
+                _write_allocations(snapshot, f"{prefix}.alloc.txt", peak, config.top_n)
+            profiler.dump_stats(f"{prefix}.pstats")
+            LOGGER.info("Wrote profile for stage %s to %s.*", name, prefix)
+    finally:
+        with _ACTIVE_LOCK:
+            _ACTIVE = False
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from cryptoscanner import backtest
+from cryptoscanner.backtest import (
+    Config,
+    _Prepared,
+    build_price_matrix,
+    default_workers,
+    evaluate,
+    param_grid,
+    run_sweep,
+)
+
+
+def test_build_price_matrix_regularises_snapshots():
+    df = pd.DataFrame({
+        "symbol": ["BTC", "ETH", "BTC"],
+        "lastPrice": [1.0, 10.0, 3.0],
+        "closeTime": pd.to_datetime(["2024-01-01 00:00:10", "2024-01-01 00:00:20", "2024-01-01 00:02:05"]),
+    })
+    times, symbols, prices = build_price_matrix(df)
+    assert list(symbols) == ["BTC", "ETH"]
+    assert len(times) == 3
+    np.testing.assert_array_equal(prices[:, 0], [1.0, 1.0, 3.0])
+    np.testing.assert_array_equal(prices[:, 1], [10.0, 10.0, 10.0])
+
+
+def test_moving_average_matches_pandas():
+    prices = np.array([[1.0, np.nan], [2.0, np.nan], [3.0, 5.0], [4.0, 6.0], [5.0, 7.0]])
+    ma = _Prepared.from_prices(prices).moving_average(3)
+    expected = pd.DataFrame(prices).rolling(3).mean().to_numpy()
+    np.testing.assert_allclose(ma, expected)
+
+
+def test_trend_following_profits_on_trend():
+    prices = np.exp(np.linspace(0, 1, 200))[:, None] * np.ones((1, 3))
+    result = evaluate(_Prepared.from_prices(prices), Config(5, 20))
+    assert result["total_return"] > 0
+    assert result["max_drawdown"] == 0
+    assert result["turnover"] > 0
+
+
+def test_sweep_in_pool_matches_in_process():
+    rng = np.random.default_rng(0)
+    prices = np.exp(np.cumsum(rng.normal(0, 0.01, size=(300, 20)), axis=0))
+    configs = param_grid((3, 5), (10, 20), (0.0, 0.001))
+    assert len(configs) == 8
+    local = run_sweep(prices, configs, max_workers=1)
+    pooled = run_sweep(prices, configs, max_workers=2)
+    pd.testing.assert_frame_equal(local, pooled)
+    assert set(local.columns) >= {"sharpe", "max_drawdown", "turnover"}
+
+
+def test_prepared_arrays_are_shared_as_memory_maps(tmp_path):
+    prices = np.exp(np.linspace(0, 1, 50))[:, None] * np.ones((1, 4))
+    prepared = _Prepared.from_prices(prices)
+    prepared.save(str(tmp_path))
+    loaded = _Prepared.load(str(tmp_path))
+    assert all(isinstance(getattr(loaded, name), np.memmap) for name in _Prepared.FIELDS)
+    assert evaluate(loaded, Config(3, 10)) == evaluate(prepared, Config(3, 10))
+
+
+def test_default_workers_fit_available_memory(monkeypatch):
+    prices = np.ones((1000, 100))
+    monkeypatch.setattr(backtest.os, "cpu_count", lambda: 16)
+    monkeypatch.setattr(backtest, "_available_memory", lambda: 3 * prices.nbytes * backtest.WORKER_ARRAYS)
+    assert default_workers(prices) == 3
+    monkeypatch.setattr(backtest, "_available_memory", lambda: 0)
+    assert default_workers(prices) == 1
+    monkeypatch.setattr(backtest, "_available_memory", lambda: None)
+    assert default_workers(prices) == 16
@@ -0,0 +1,34 @@
+import decimal
+
+from benchmarks import run_benchmarks, synthetic
+from benchmarks.run_benchmarks import compare, run
+
+
+def test_synthetic_generators_are_seeded():
+    a = synthetic.make_market_raw_metrics(10, 3, seed=1)
+    b = synthetic.make_market_raw_metrics(10, 3, seed=1)
+    assert len(a) == 30
+    assert a.equals(b)
+    tx = synthetic.make_onchain_transactions(100, n_addresses=10)
+    assert isinstance(tx.iloc[0]["eth_transferred"], decimal.Decimal)
+    assert isinstance(tx.iloc[0]["address"], bytes)
+
+
+def test_run_and_compare(monkeypatch):
+    tiny = {"symbols": 5, "snapshots": 25, "transactions": 100, "days": 5}
+    monkeypatch.setitem(run_benchmarks.SCALES, "tiny", tiny)
+    results = run(["tiny"], repeat=1)
+    assert "generate_decisions" in results["tiny"]
+    slower = {"tiny": {"x": {"seconds": 1.0, "peak_mb": 1.0}}}
+    baseline = {"tiny": {"x": {"seconds": 0.5, "peak_mb": 1.0}}}
+    assert compare(slower, baseline, threshold=0.25) == ["tiny/x seconds: 0.5000 -> 1.0000 (+100%)"]
+    assert compare(baseline, baseline, threshold=0.25) == []
+
+
+def test_run_compact_variant(monkeypatch):
+    tiny = {"symbols": 5, "snapshots": 25, "transactions": 100, "days": 5}
+    monkeypatch.setitem(run_benchmarks.SCALES, "tiny", tiny)
+    results = run(["tiny"], stages=["convert_decimal_to_float"], repeat=1, compact=True)
+    plain = results["tiny"]["convert_decimal_to_float"]
+    compact = results["tiny/compact"]["convert_decimal_to_float"]
+    assert compact["input_mb"] < plain["input_mb"]
@@ -0,0 +1,89 @@
+import decimal
+from unittest.mock import MagicMock
+
+import pandas as pd
+import pyarrow as pa
+from google.cloud import bigquery
+
+from cryptoscanner.bigquery_client import (
+    compact_arrow_table,
+    compact_to_pandas,
+    ensure_table,
+    merge_dataframe,
+    read_dataframe,
+    reset_caches,
+    to_bigquery_dtypes,
+    write_dataframe,
+)
+from cryptoscanner.module_1_4 import build_bars
+
+
+def test_compact_arrow_table():
+    table = pa.table({
+        "address": pa.array([b"\x01\x02", b"\x01\x02", b"\xff"], pa.binary()),
+        "source": ["ethereum"] * 3,
+        "eth_transferred": pa.array([decimal.Decimal("1.5")] * 3, pa.decimal128(38, 9)),
+        "gas_price_gwei": [1.0, 2.0, 3.0],
+    })
+    df = compact_arrow_table(table, downcast_floats=True).to_pandas()
+    assert isinstance(df["address"].dtype, pd.CategoricalDtype)
+    assert list(df["address"]) == ["0102", "0102", "ff"]
+    assert isinstance(df["source"].dtype, pd.CategoricalDtype)
+    assert df["eth_transferred"].dtype == "float64"
+    assert df["gas_price_gwei"].dtype == "float32"
+
+
+def test_compact_round_trip_to_bigquery_dtypes():
+    table = pa.table({"symbol": ["BTC", "ETH", "BTC"], "lastPrice": [1.0, 2.0, 3.0]})
+    compact = compact_arrow_table(table, downcast_floats=True).to_pandas()
+    assert isinstance(compact["symbol"].dtype, pd.CategoricalDtype)
+    assert compact["lastPrice"].dtype == "float32"
+    restored = to_bigquery_dtypes(compact)
+    assert not isinstance(restored["symbol"].dtype, pd.CategoricalDtype)
+    assert restored["lastPrice"].dtype == "float64"
+    assert list(restored["symbol"]) == ["BTC", "ETH", "BTC"]
+
+
+def test_compact_read_keeps_stored_floats_exact():
+    prices = [67123.45, 12.345678901]
+    table = pa.table({
+        "symbol": ["BTC", "ETH"],
+        "lastPrice": prices,
+        "closeTime": pa.array([pd.Timestamp("2024-01-01", tz="UTC")] * 2),
+    })
+    bars = to_bigquery_dtypes(build_bars(compact_to_pandas(table), "5min"))
+    assert sorted(bars["close"]) == sorted(prices)
+
+
+def test_read_and_write_compact():
+    client = MagicMock()
+    client.query.return_value.to_arrow.return_value = pa.table({"symbol": ["BTC", "BTC"], "ma5": [1.0, 2.0]})
+    df = read_dataframe("p.d.t", client, compact=True)
+    assert isinstance(df["symbol"].dtype, pd.CategoricalDtype)
+    write_dataframe(df, "p.d.out", client)
+    loaded = client.load_table_from_dataframe.call_args[0][0]
+    assert loaded["ma5"].dtype == "float64"
+    assert not isinstance(loaded["symbol"].dtype, pd.CategoricalDtype)
+
+
+def test_merge_dataframe_builds_upsert():
+    client = MagicMock()
+    schema = [bigquery.SchemaField("symbol", "STRING"), bigquery.SchemaField("high", "FLOAT")]
+    df = pd.DataFrame({"symbol": ["BTC"], "high": [1.0]})
+    merge_dataframe(df, "p.d.bars", schema, ["symbol"], client, {"high": "GREATEST(T.high, S.high)"})
+    assert client.load_table_from_dataframe.call_args[0][1] == "p.d.bars_staging"
+    query = client.query.call_args[0][0]
+    assert query.startswith("MERGE `p.d.bars` T USING `p.d.bars_staging` S ON T.`symbol` = S.`symbol`")
+    assert "UPDATE SET `high` = GREATEST(T.high, S.high)" in query
+
+
+def test_ensure_table_partitions_new_tables():
+    reset_caches()
+    client = MagicMock()
+    client.get_table.side_effect = Exception("not found")
+    schema = [bigquery.SchemaField("symbol", "STRING"), bigquery.SchemaField("closeTime", "TIMESTAMP")]
+    ensure_table(client, "p.d.raw", schema, partition_field="closeTime", clustering_fields=["symbol"])
+    table = client.create_table.call_args[0][0]
+    assert table.time_partitioning.field == "closeTime"
+    assert table.clustering_fields == ["symbol"]
+    reset_caches()
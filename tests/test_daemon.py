@@ -0,0 +1,96 @@
+import threading
+
+from cryptoscanner.daemon import DEPENDENCY_POLL_SECONDS, Daemon
+
+
+def _wait_idle(daemon):
+    for _ in range(200):
+        with daemon._lock:
+            if not daemon._running:
+                return
+        threading.Event().wait(0.01)
+
+
+def test_tick_schedules_each_stage_on_its_interval():
+    calls = []
+    daemon = Daemon(
+        {"ingest": lambda: calls.append("ingest"), "alerting": lambda: calls.append("alerting")},
+        intervals={"ingest": 60, "alerting": 3600},
+    )
+    try:
+        assert daemon.tick(0.0) == 60.0
+        _wait_idle(daemon)
+        assert sorted(calls) == ["alerting", "ingest"]
+        daemon.tick(30.0)
+        daemon.tick(60.0)
+        _wait_idle(daemon)
+        assert calls.count("ingest") == 2
+        assert calls.count("alerting") == 1
+    finally:
+        daemon.shutdown()
+
+
+def test_overlapping_runs_are_skipped_or_queued():
+    for overlap, expected in (("skip", 1), ("queue", 2)):
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            release.wait(5)
+
+        daemon = Daemon({"ingest": slow}, intervals={"ingest": 1}, overlap=overlap)
+        try:
+            daemon.tick(0.0)
+            daemon.tick(1.0)
+            daemon.tick(2.0)
+            release.set()
+            _wait_idle(daemon)
+            _wait_idle(daemon)
+        finally:
+            daemon.shutdown()
+        assert len(calls) == expected
+
+
+def test_stages_wait_for_running_dependencies_and_skip_failed_ones():
+    release = threading.Event()
+    calls = []
+
+    def ingest():
+        calls.append("ingest")
+        release.wait(5)
+
+    def indicators():
+        calls.append("indicators")
+        raise RuntimeError("boom")
+
+    daemon = Daemon(
+        {"ingest": ingest, "indicators": indicators, "decisions": lambda: calls.append("decisions")},
+        intervals={"ingest": 60, "indicators": 60, "decisions": 60},
+        depends_on={"indicators": ["ingest"], "decisions": ["indicators"]},
+    )
+    try:
+        assert daemon.tick(0.0) == DEPENDENCY_POLL_SECONDS
+        assert calls == ["ingest"]
+        release.set()
+        _wait_idle(daemon)
+        daemon.tick(1.0)
+        _wait_idle(daemon)
+        assert calls == ["ingest", "indicators"]
+        daemon.tick(2.0)
+        _wait_idle(daemon)
+        assert calls == ["ingest", "indicators"]
+        assert daemon._next_due["decisions"] == 62.0
+    finally:
+        daemon.shutdown()
+
+
+def test_repeated_runs_overwrite_one_report_per_stage(tmp_path):
+    daemon = Daemon({"ingest": lambda: None}, intervals={"ingest": 1}, metrics_dir=str(tmp_path))
+    try:
+        for now in (0.0, 1.0, 2.0):
+            daemon.tick(now)
+            _wait_idle(daemon)
+    finally:
+        daemon.shutdown()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["cryptoscanner.prom", "metrics_ingest.json"]
@@ -0,0 +1,71 @@
+import json
+from unittest.mock import MagicMock
+
+import pandas as pd
+import pyarrow as pa
+
+from cryptoscanner import metrics
+from cryptoscanner.bigquery_client import iter_record_batches, read_dataframe, write_dataframe
+
+
+def test_track_rolls_up_reads_and_writes(tmp_path):
+    metrics.reset()
+    client = MagicMock()
+    query_job = client.query.return_value
+    query_job.to_dataframe.return_value = pd.DataFrame({"a": [1, 2, 3]})
+    query_job.total_bytes_processed = 100
+    query_job.total_bytes_billed = 10_485_760
+    query_job.slot_millis = 42
+    query_job.cache_hit = True
+    query_job.job_id = "job-1"
+
+    with metrics.track("indicators") as stage:
+        df = read_dataframe("p.d.raw", client)
+        write_dataframe(df.head(2), "p.d.out", client)
+
+    assert stage.rows_in == 3
+    assert stage.rows_out == 2
+    assert stage.bytes_transferred == 24
+    assert stage.total_bytes_billed == 10_485_760
+    assert stage.slot_millis == 42
+    assert stage.cache_hits == 1
+    assert stage.jobs == 2
+    assert [r.kind for r in metrics.records()] == ["read", "write", "stage"]
+    assert all(r.stage == "indicators" for r in metrics.records())
+
+    metrics.export(str(tmp_path), "run1")
+    prom = (tmp_path / "cryptoscanner.prom").read_text()
+    assert 'cryptoscanner_slot_millis{stage="indicators",kind="stage",name="indicators"} 42' in prom
+    report = json.loads((tmp_path / "metrics_run1.json").read_text())
+    assert report["run_id"] == "run1"
+    assert len(report["operations"]) == 3
+
+
+def test_track_marks_failures():
+    metrics.reset()
+    try:
+        with metrics.track("ingest"):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert metrics.records()[0].status == "error"
+    assert 'cryptoscanner_success{stage="ingest",kind="stage",name="ingest"} 0' in metrics.to_prometheus()
+
+
+def test_iter_record_batches_early_close_is_not_an_error():
+    metrics.reset()
+    client = MagicMock()
+    query_job = client.query.return_value
+    query_job.job_id = "job-1"
+    batches = [pa.RecordBatch.from_pydict({"a": [1, 2]}), pa.RecordBatch.from_pydict({"a": [3]})]
+    query_job.result.return_value.to_arrow_iterable.return_value = iter(batches)
+
+    stream = iter_record_batches("p.d.t", client)
+    next(stream)
+    stream.close()
+
+    (record,) = metrics.records()
+    assert record.status == "ok"
+    assert record.jobs == 1
+    assert record.rows_out == 2
+    assert record.bytes_transferred == batches[0].nbytes
@@ -1,8 +1,16 @@
 import pandas as pd
-from cryptoscanner.module_1_2 import compute_moving_averages
+import pytest
+
+from cryptoscanner.module_1_2 import compute_moving_averages, run_indicator_job
 
 
 def test_compute_moving_averages():
     df = pd.DataFrame({"symbol": ["BTC"], "lastPrice": [1], "closeTime": [pd.Timestamp('2024-01-01')]})
     result = compute_moving_averages(df)
     assert "ma5" in result.columns
+
+
+def test_run_indicator_job_rejects_unknown_timeframe(monkeypatch):
+    monkeypatch.setenv("INDICATOR_TIMEFRAME", "15m")
+    with pytest.raises(ValueError, match="15m"):
+        run_indicator_job()
@@ -0,0 +1,17 @@
+import pandas as pd
+from cryptoscanner.module_1_4 import build_bars
+
+
+def test_build_bars():
+    df = pd.DataFrame({
+        "symbol": ["BTC", "BTC", "ETH", "BTC"],
+        "lastPrice": [3.0, 1.0, 10.0, 2.0],
+        "closeTime": pd.to_datetime([
+            "2024-01-01 00:01", "2024-01-01 00:00", "2024-01-01 00:02", "2024-01-01 00:06",
+        ]),
+    })
+    bars = build_bars(df, "5min").set_index(["symbol", "bar_start"])
+    first = bars.loc[("BTC", pd.Timestamp("2024-01-01 00:00"))]
+    assert (first["open"], first["high"], first["low"], first["close"]) == (1.0, 3.0, 1.0, 3.0)
+    assert first["n_snapshots"] == 2
+    assert len(bars) == 3
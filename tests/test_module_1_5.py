@@ -0,0 +1,43 @@
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+import pytest
+from google.api_core.exceptions import Forbidden, NotFound
+
+from cryptoscanner.module_1_5 import compute_screen_features, load_active_universe, select_universe
+
+
+def _ticker(n):
+    return pd.DataFrame({
+        "symbol": [f"S{i}" for i in range(n)],
+        "priceChangePercent": [str(i % 7 - 3) for i in range(n)],
+        "quoteVolume": [str(10 ** (i % 6)) for i in range(n)],
+        "bidPrice": ["1.0"] * n,
+        "askPrice": ["1.001"] * (n - 1) + ["0"],
+    })
+
+
+def test_compute_screen_features():
+    features = compute_screen_features(_ticker(10))
+    assert {"change_pct_rank", "volume_pct_rank", "momentum_z", "volume_z", "spread_z", "score"} <= set(features.columns)
+    assert features["score"].iloc[-1] == -np.inf
+    assert features["volume_pct_rank"].between(0, 1).all()
+
+
+def test_select_universe_hysteresis():
+    features = pd.DataFrame({"symbol": list("ABCDE"), "score": [5.0, 4.0, 3.0, 2.0, -np.inf]})
+    first = select_universe(features, top_n=2, exit_factor=1.5)
+    assert first["symbol"].tolist() == ["A", "B"]
+    # C ranks 3rd, outside top 2 but inside the exit band: it stays.
+    again = select_universe(features, previous={"A", "C", "E"}, top_n=2, exit_factor=1.5)
+    assert again["symbol"].tolist() == ["A", "B", "C"]
+
+
+def test_load_active_universe_only_tolerates_missing_table():
+    client = MagicMock()
+    client.query.side_effect = NotFound("no table")
+    assert load_active_universe(client, "p.d.universe") == []
+    client.query.side_effect = Forbidden("denied")
+    with pytest.raises(Forbidden):
+        load_active_universe(client, "p.d.universe")
@@ -1,5 +1,5 @@
 import pandas as pd
-from cryptoscanner.module_2_3 import detect_anomalies
+from cryptoscanner.module_2_3 import compute_daily_onchain, detect_anomalies
 
 
 def test_detect_anomalies():
@@ -11,3 +11,15 @@ def test_detect_anomalies():
     result = detect_anomalies(df)
     assert "anomaly_eth_transferred" in result.columns
     assert "anomaly_gas_price" in result.columns
+
+
+def test_compute_daily_onchain_weights_rollups():
+    df = pd.DataFrame({
+        "timestamp": [pd.Timestamp("2024-01-01 01:00"), pd.Timestamp("2024-01-01")],
+        "eth_transferred": [1.0, 9.0],
+        "gas_price_gwei": [10.0, 20.0],
+        "tx_count": [1, 3],
+    })
+    out = compute_daily_onchain(df)
+    assert out.iloc[0]["eth_transferred"] == 10.0
+    assert out.iloc[0]["gas_price_gwei"] == 17.5
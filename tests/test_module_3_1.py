@@ -1,13 +1,39 @@
-from cryptoscanner.module_3_1 import fetch_messages, build_summary_from_dfs
+from cryptoscanner.module_3_1 import fetch_messages, format_messages, build_summary_from_dfs
 import pandas as pd
+import pyarrow as pa
 from unittest.mock import MagicMock
 
 
 def test_fetch_messages():
     client = MagicMock()
-    client.query.return_value.to_dataframe.return_value = pd.DataFrame({"a": [1]})
+    batches = [
+        pa.RecordBatch.from_pydict({"a": [1, 2]}),
+        pa.RecordBatch.from_pydict({"a": [3]}),
+    ]
+    client.query.return_value.result.return_value.to_arrow_iterable.return_value = iter(batches)
     msgs = list(fetch_messages("table", client))
-    assert msgs
+    assert msgs == ["a=1", "a=2", "a=3"]
+
+
+def test_fetch_messages_filters():
+    client = MagicMock()
+    client.query.return_value.result.return_value.to_arrow_iterable.return_value = iter([])
+    list(fetch_messages("table", client, since=pd.Timestamp("2024-01-01"), limit=5))
+    query = client.query.call_args[0][0]
+    assert "WHERE `timestamp` >= @since" in query
+    assert query.endswith("ORDER BY `timestamp` DESC LIMIT 5")
+
+
+def test_format_messages():
+    batch = pa.RecordBatch.from_pydict({
+        "symbol": ["BTC", None],
+        "price": [0.5, None],
+        "timestamp": pa.array([pd.Timestamp("2024-01-01", tz="UTC"), None], pa.timestamp("us", "UTC")),
+    })
+    assert format_messages(batch).to_pylist() == [
+        "symbol=BTC, price=0.5, timestamp=2024-01-01 00:00:00.000000Z",
+        "symbol=None, price=None, timestamp=None",
+    ]
 
 
 def test_build_summary_from_dfs():
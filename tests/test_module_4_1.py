@@ -0,0 +1,78 @@
+import sqlite3
+
+import pytest
+
+from cryptoscanner.module_4_1 import (
+    build_compaction_script,
+    market_metrics_source,
+    onchain_metrics_source,
+    run_compaction_job,
+)
+
+
+def test_compaction_script_rolls_up_then_deletes():
+    script = build_compaction_script("p", "d")
+    assert script.index("BEGIN TRANSACTION") < script.index("INSERT INTO `p.d.market_rollup_hourly`")
+    assert script.index("INSERT INTO `p.d.market_rollup_hourly`") < script.index("DELETE FROM `p.d.market_raw_metrics`")
+    assert script.index("INSERT INTO `p.d.onchain_rollup_daily`") < script.index("DELETE FROM `p.d.onchain_raw_metrics`")
+    assert script.strip().endswith("COMMIT TRANSACTION;")
+    assert "@retention_days" in script
+
+
+def test_sources_union_raw_and_rollup():
+    market = market_metrics_source("p", "d")
+    assert "`p.d.market_raw_metrics`" in market and "`p.d.market_rollup_hourly`" in market
+    onchain = onchain_metrics_source("p", "d")
+    assert "UNION ALL" in onchain and "1 AS tx_count" in onchain
+
+
+def _db():
+    # SQLite accepts BigQuery's backtick-quoted ids and @name parameters, so
+    # the generated FROM items can run unchanged on ISO timestamp strings.
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE `p.d.market_raw_metrics` (symbol, priceChangePercent, lastPrice, closeTime)")
+    db.execute(
+        "CREATE TABLE `p.d.market_rollup_hourly` "
+        "(symbol, priceChangePercent, lastPrice, closeTime, open, high, low, n_snapshots)"
+    )
+    db.execute("CREATE TABLE `p.d.onchain_raw_metrics` (timestamp, address, eth_transferred, gas_price_gwei, source)")
+    db.execute("CREATE TABLE `p.d.onchain_rollup_daily` (timestamp, source, eth_transferred, gas_price_gwei, tx_count)")
+    db.executemany(
+        "INSERT INTO `p.d.market_raw_metrics` VALUES (?, ?, ?, ?)",
+        [("BTC", 1.0, 110.0, "2024-01-08 00:01"), ("BTC", 1.0, 111.0, "2024-01-08 00:02")],
+    )
+    db.executemany(
+        "INSERT INTO `p.d.market_rollup_hourly` VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [("BTC", 0.5, 100.0, "2024-01-01 10:59", 99.0, 101.0, 98.0, 60),
+         ("BTC", 0.5, 105.0, "2024-01-05 10:59", 104.0, 106.0, 103.0, 60)],
+    )
+    db.execute("INSERT INTO `p.d.onchain_raw_metrics` VALUES ('2024-01-08 12:00', 'ab', 2.0, 30.0, 'ethereum')")
+    db.execute("INSERT INTO `p.d.onchain_rollup_daily` VALUES ('2024-01-01 00:00', 'ethereum', 50.0, 20.0, 1000)")
+    return db
+
+
+def test_market_source_returns_raw_and_rollup_rows_since_bound():
+    db = _db()
+    query = f"SELECT symbol, lastPrice, closeTime FROM {market_metrics_source('p', 'd', since='@since')} ORDER BY closeTime"
+    rows = db.execute(query, {"since": "2024-01-02 00:00"}).fetchall()
+    assert rows == [("BTC", 105.0, "2024-01-05 10:59"), ("BTC", 110.0, "2024-01-08 00:01"), ("BTC", 111.0, "2024-01-08 00:02")]
+    assert len(db.execute(f"SELECT * FROM {market_metrics_source('p', 'd')}").fetchall()) == 4
+
+
+def test_onchain_source_marks_rollup_rows():
+    db = _db()
+    rows = db.execute(f"SELECT * FROM {onchain_metrics_source('p', 'd')} ORDER BY timestamp").fetchall()
+    assert rows == [
+        ("2024-01-01 00:00", None, 50.0, 20.0, "ethereum", 1000),
+        ("2024-01-08 12:00", "ab", 2.0, 30.0, "ethereum", 1),
+    ]
+    since = {"since": "2024-01-02 00:00"}
+    assert len(db.execute(f"SELECT * FROM {onchain_metrics_source('p', 'd', since='@since')}", since).fetchall()) == 1
+
+
+def test_run_compaction_job_rejects_non_positive_retention(monkeypatch):
+    with pytest.raises(ValueError):
+        run_compaction_job(retention_days=0)
+    monkeypatch.setenv("RAW_RETENTION_DAYS", "-1")
+    with pytest.raises(ValueError):
+        run_compaction_job()
@@ -0,0 +1,77 @@
+import subprocess
+import sys
+
+import pytest
+
+from cryptoscanner import pipeline
+from cryptoscanner.pipeline import Stage, parse_args, run_stages
+
+HEAVY_MODULES = ["pandas", "google.cloud.bigquery", "requests", "telegram"]
+
+
+def _import_in_subprocess(statement):
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"{statement}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"print(elapsed, [m for m in {HEAVY_MODULES!r} if m in sys.modules])\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    elapsed, loaded = out.split(" ", 1)
+    return float(elapsed), loaded.strip()
+
+
+def test_package_import_is_lazy():
+    elapsed, loaded = _import_in_subprocess("import cryptoscanner, cryptoscanner.pipeline")
+    assert loaded == "[]"
+    # Laziness is checked above; this only catches an import that got
+    # drastically slower, with enough headroom for a loaded CI machine.
+    assert elapsed < 5.0, f"cold package import took {elapsed:.2f}s"
+
+
+def test_lazy_attribute_resolves():
+    import cryptoscanner
+    from cryptoscanner.module_1_2 import run_indicator_job
+
+    assert cryptoscanner.run_indicator_job is run_indicator_job
+    with pytest.raises(AttributeError):
+        cryptoscanner.does_not_exist
+
+
+def test_run_stages_subset_and_dependencies(monkeypatch):
+    calls = []
+
+    def fake(name, fail=False):
+        def job():
+            calls.append(name)
+            if fail:
+                raise RuntimeError(name)
+        return job
+
+    stages = {
+        "a": Stage("a", "", ""),
+        "b": Stage("b", "", "", critical=False),
+        "c": Stage("c", "", "", critical=False, depends_on=("b",)),
+        "d": Stage("d", "", ""),
+        "e": Stage("e", "", "", default=False),
+    }
+    jobs = {"a": fake("a"), "b": fake("b", fail=True), "c": fake("c"), "d": fake("d"), "e": fake("e")}
+    monkeypatch.setattr(pipeline, "STAGES", stages)
+    monkeypatch.setattr(Stage, "load", lambda self: jobs[self.name])
+
+    assert run_stages(["d", "a"]) == []
+    assert calls == ["a", "d"]
+    calls.clear()
+    assert run_stages() == ["b", "c"]
+    assert calls == ["a", "b", "d"]
+    calls.clear()
+    assert run_stages(["e"]) == []
+    assert calls == ["e"]
+    with pytest.raises(ValueError):
+        run_stages(["nope"])
+
+
+def test_parse_args_stage_selection():
+    assert parse_args([]).stages == []
+    assert parse_args(["indicators", "decisions"]).stages == ["indicators", "decisions"]
@@ -0,0 +1,34 @@
+from cryptoscanner.profiling import ProfileConfig, profile_stage
+
+
+def test_profile_stage_writes_reports(tmp_path):
+    config = ProfileConfig(enabled=True, directory=str(tmp_path), top_n=5)
+    with profile_stage("ingest", config) as active:
+        sum(list(range(1000)))
+    assert active
+    assert len(list(tmp_path.glob("ingest_*.pstats"))) == 1
+    alloc = next(tmp_path.glob("ingest_*.alloc.txt")).read_text()
+    assert alloc.startswith("peak traced memory")
+
+
+def test_profile_stage_disabled_or_unsampled(tmp_path):
+    for config in (
+        ProfileConfig(enabled=False, directory=str(tmp_path)),
+        ProfileConfig(enabled=True, directory=str(tmp_path), sample_rate=0.0),
+    ):
+        with profile_stage("ingest", config) as active:
+            pass
+        assert not active
+    assert not list(tmp_path.iterdir())
+
+
+def test_profile_stage_is_exclusive_and_memory_optional(tmp_path):
+    config = ProfileConfig(enabled=True, directory=str(tmp_path), memory=False)
+    with profile_stage("indicators", config) as outer:
+        with profile_stage("decisions", config) as inner:
+            pass
+    assert outer and not inner
+    assert [p.suffix for p in tmp_path.iterdir()] == [".pstats"]
+    with profile_stage("decisions", config) as again:
+        pass
+    assert again